@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import time
 import logging
 import socket
@@ -8,10 +9,15 @@ import fcntl
 import struct
 import warnings
 import datetime
-import threading
+from bisect import bisect_right
+from contextlib import contextmanager
 from time import gmtime, strftime
 from modules import app, cbpi
 from .i2c import CharLCD
+from .writer import DisplayWriter
+from .scheduler import DisplayScheduler, SWITCHED, TIMEOUT
+from .layout import Layout
+from .stats import DriverStats
 
 # LCDVERSION = '4.1.00'
 #
@@ -47,10 +53,37 @@ from .i2c import CharLCD
 # 23.08.2020 Python 3 compatibility. Contributed by avollkopf. Thanks very much!
 # 28.08.2020 added lcd._set_cursor_mode('hide') to avoid cursor mode which sometimes happens randomly
 # 27.08.2020 Future features: in fermentation mode in line 4 show a selectable sensor like iSpindel, pressure etc.
+# 17.10.2026 screens no longer write to the LCD from the lcdjob and multidisplay threads, they submit 4x20 frames
+#            to a single writer thread which owns the LCD and only writes the latest frame
+# 17.10.2026 parameters are read once and held in memory, reloaded when a parameter is saved or every 30s
+# 17.10.2026 network interfaces for the IP in standby are configurable, addresses are looked up once a minute
+# 17.10.2026 the CBPi version is read once and only again when version.yaml changes, its path is configurable
+# 17.10.2026 no more clearing of the display between pages, only characters which differ are written (no flicker)
+# 17.10.2026 one scheduler thread renders the selected display mode, lcdjob no longer starts threads
+# 17.10.2026 optional event driven redraws (parameter LCD_Redraw), the LCD reacts on sensor and actor changes at once
+# 17.10.2026 screens are declared as layouts, the fixed text is encoded once and only changed values are encoded
+# 17.10.2026 clocks and timers are redrawn on the full second, not on every tick of the lcdjob
+# 17.10.2026 fermenter steps are indexed by fermenter, the index is rebuilt when the steps change
+# 17.10.2026 hop additions are parsed once per Boil step, more than 5 hop additions are shown
+# 17.10.2026 custom symbols and ÄÖÜß are loaded into the LCD when needed, up to 8 at the same time
+# 17.10.2026 optional statistics of the LCD bus usage and render times in app.log (parameter LCD_Statistics)
+# 17.10.2026 more LCDs with their own display mode (parameter LCD_Extra_Displays), LCDs on the same I2C port
+#            take turns in writing their frames
+# 17.10.2026 40x4 LCDs on a MCP23017 (setting size=40x4 in LCD_Extra_Displays), multidisplay shows four kettles at once
 
 DEBUG = False  # turn True to show (much) more debug info in app.log
-BLINK = False  # start value for blinking the beerglass during heating only for single mode
+LCD_TICK = 0.7  # seconds between two runs of the lcdjob and two frames of single mode and standby
+EVENT_TICK = 1.0  # seconds between two frames of single mode and standby if redraws are event driven
+MIN_REDRAW = 0.1  # minimum seconds between two redraws caused by sensor or actor updates
+CONFIG_TTL = 30.0  # seconds until the parameters are read again if CBPi does not report a change
+FERMENTER_TTL = 10.0  # seconds until the fermenter steps are indexed again if CBPi does not report a change
+IP_REFRESH = 60.0  # seconds until the addresses of the network interfaces are looked up again
+VERSION_PATH = "/home/pi/craftbeerpi3/config/version.yaml"  # default location of the CBPi version file
 # beerglass symbol
+# private use characters shown with the custom glyphs of the LCD
+BEERGLASS = u"\ue000"
+ICE = u"\ue001"
+
 bierkrug = (
     0b11100,
     0b00000,
@@ -117,17 +150,113 @@ esszett = (
     0b10000
 )
 
+# screen layouts, the width of every field is part of its format spec
+MASH_LAYOUT = Layout([u"{step:<19}{heater:1}",
+                      u"{kettle:<20}",
+                      u"Targ. Temp:{target:6.2f}°{unit:1}",
+                      u"Curr. Temp:{current:6.2f}°{unit:1}"])
+MASH_TIMER_LAYOUT = Layout([u"{step:<19}{heater:1}",
+                            u"{kettle:<11} {remaining:8}",
+                            u"Targ. Temp:{target:6.2f}°{unit:1}",
+                            u"Curr. Temp:{current:6.2f}°{unit:1}"],
+                           refresh={"remaining": 1.0})
+BOIL_LAYOUT = Layout([u"{step:<19}{heater:1}",
+                      u"{kettle:<20}",
+                      u"Set|Act:{target:4.0f}{sep:1}{current:5.1f}°{unit:1}",
+                      u"{hop:<20}"])
+BOIL_TIMER_LAYOUT = Layout([u"{step:<19}{heater:1}",
+                            u"{kettle:<11} {remaining:8}",
+                            u"Set|Act:{target:4.0f}{sep:1}{current:5.1f}°{unit:1}",
+                            u"{hop:<20}"],
+                           refresh={"remaining": 1.0, "hop": 1.0})
+FERMENTER_LAYOUT = Layout([u"{brew:<17}{symbols:3}",
+                           u"{fermenter:<20}",
+                           u"Set|Act:{target:5.1f}°{current:4.1f}°{unit:1}",
+                           u"{gravity:<20}"],
+                          refresh={"fermenter": 1.0})
+SENSOR_LAYOUT = Layout([u"CBPi3 LCD Sensormode",
+                        u"--------------------",
+                        u"{name:<20}",
+                        u"{value:<20}"])
+STANDBY_LAYOUT = Layout([u"CraftBeerPi {version:<8}",
+                         u"{brewery:<20}",
+                         u"IP: {ip:<16}",
+                         u"{clock:<20}"],
+                        refresh={"clock": 1.0})
+WIDE_COLS = 40  # LCDs with at least this many columns show a row per kettle in multidisplay mode
+WIDE_KETTLES = 4  # kettles on one page of a 40x4 LCD
+
+
+def wide_kettle_layout(count, timer):
+    # a row per kettle, the timer of the step at the end of every row
+    rows = []
+    for i in range(count):
+        row = u"{kettle%d:<14}{heater%d:1} {target%d:5.1f}°|{current%d:5.1f}°{unit:1}" % (i, i, i, i)
+        rows.append(row + u"  {remaining:8}" if timer else row)
+    return Layout(rows, cols=WIDE_COLS, refresh={"remaining": 1.0} if timer else None)
+
+
+# layouts for 1 to 4 kettles, with and without timer
+WIDE_KETTLE_LAYOUTS = dict(((count, timer), wide_kettle_layout(count, timer))
+                           for count in range(1, WIDE_KETTLES + 1) for timer in (False, True))
+# settings of a display in parameter LCD_Extra_Displays
+DISPLAY_SETTINGS = ("expander", "bank", "port", "size", "charmap", "mode", "kettle", "sensortype")
+DISPLAY_MODES = ("Multidisplay", "Singledisplay", "Sensordisplay", "Fermentationdisplay")
+displays = []  # the LCDs, the first one is the one at LCD_Address
+lcd_stats = None  # counters and timings of all LCDs if parameter LCD_Statistics is on
+
+
+class Display(object):
+    """
+    One LCD and the display mode it shows. Mode, kettle and sensor type are taken from the parameters unless
+    they are set for this display. Displays on the same I2C port share one writer, which writes their frames
+    in turns.
+    """
+
+    def __init__(self, name, lcd, writer, charmap, mode=None, kettle_id=None, sensortype=None):
+        self.name = name
+        self.lcd = lcd
+        self.writer = writer
+        self.charmap = charmap
+        self.mode = mode
+        self.kettle_id = kettle_id
+        self.sensortype = sensortype
+        self.compiled_layouts = {}
+        self.next_redraw = None  # time when the next periodic field of the last rendered layout is due
+        self.blink = False  # the beerglass blinks during heating in single mode
+
+    def submit(self, frame):
+        self.writer.submit(frame, lcd=self.lcd)
 
-def lcd(LCDaddress, characters):
+
+def lcd(LCDaddress, characters, expander='PCF8574', port=1, bank=None, cols=20, rows=4):
     try:
-        lcd = CharLCD(i2c_expander='PCF8574', address=LCDaddress, port=1, cols=20, rows=4, dotsize=8,
+        # only the PCF8574 can batch its writes
+        transfer_mode = 'block' if expander == 'PCF8574' else 'byte'
+        # LCDs with more than 80 characters, like 40x4, have a second controller with its own enable line
+        controllers = 2 if cols * rows > 80 else 1
+        expander_params = {'gpio_bank': bank, 'controllers': controllers} if expander == 'MCP23017' else None
+        lcd = CharLCD(i2c_expander=expander, address=LCDaddress, expander_params=expander_params, port=port,
+                      cols=cols, rows=rows, dotsize=8,
                       charmap=characters,
-                      auto_linebreaks=True, backlight_enabled=True)
+                      auto_linebreaks=True, backlight_enabled=True, transfer_mode=transfer_mode)
         return lcd
     except:
         pass
 
 
+def define_glyphs(lcd, characters):
+    # custom glyphs are loaded into the LCD when a screen shows them for the first time
+    lcd.glyphs.define(BEERGLASS, bierkrug)
+    lcd.glyphs.define(ICE, cool)
+    if characters == "A00":
+        # A02 has build in ÄÖÜß
+        lcd.glyphs.define(u"Ä", awithdots)
+        lcd.glyphs.define(u"Ö", owithdots)
+        lcd.glyphs.define(u"Ü", uwithdots)
+        lcd.glyphs.define(u"ß", esszett)
+
+
 def set_lcd_address():
     adr = cbpi.get_config_parameter('LCD_Address', None)
     if adr is None:
@@ -195,218 +324,498 @@ def set_parameter_id1():
     return kettleid
 
 
-def set_ip():
-    if get_ip('wlan0') != 'Not connected':
-        ip = get_ip('wlan0')
-    elif get_ip('eth0') != 'Not connected':
-        ip = get_ip('eth0')
-    elif get_ip('enxb827eb488a6e') != 'Not connected':
-        ip = get_ip('enxb827eb488a6e')
-    else:
+def set_redraw_mode():
+    redraw = cbpi.get_config_parameter('LCD_Redraw', None)
+    if redraw is None:
+        cbpi.add_config_parameter('LCD_Redraw', 'Polling', 'select',
+                                  'Polling redraws the LCD every 0.7s, Events redraws it as soon as a sensor or actor '
+                                  'changes, NO! CBPi reboot required', ['Polling', 'Events'])
+        redraw = cbpi.get_config_parameter('LCD_Redraw', None)
+        cbpi.app.logger.info("LCDDisplay  - set_redraw_mode added: %s" % redraw)
+    return redraw
+
+
+def set_statistics():
+    minutes = cbpi.get_config_parameter('LCD_Statistics', None)
+    if minutes is None:
+        cbpi.add_config_parameter('LCD_Statistics', 'Off', 'select',
+                                  'Log bus usage and render times of the LCD to app.log every x minutes, '
+                                  'CBPi reboot required', ['Off', '1', '10', '60'])
+        minutes = cbpi.get_config_parameter('LCD_Statistics', None)
+        cbpi.app.logger.info("LCDDisplay  - set_statistics added: %s" % minutes)
+    return None if str(minutes) == 'Off' else float(minutes)
+
+
+def set_extra_displays():
+    extra = cbpi.get_config_parameter('LCD_Extra_Displays', None)
+    if extra is None:
+        cbpi.add_config_parameter('LCD_Extra_Displays', '', 'string',
+                                  'More LCDs separated by ;, each an address and optional expander=, bank=, port=, '
+                                  'size=, charmap=, mode=, kettle=, sensortype= e.g. 0x26 mode=Fermentationdisplay, '
+                                  'CBPi reboot required')
+        extra = cbpi.get_config_parameter('LCD_Extra_Displays', None)
+        cbpi.app.logger.info("LCDDisplay  - set_extra_displays added: %s" % extra)
+    return parse_displays(str(extra))
+
+
+def parse_displays(text):
+    """
+    Returns the settings of every display in text, e.g. "0x26 mode=Fermentationdisplay; 0x20 expander=MCP23017
+    bank=A size=40x4", as dicts with the address as int and the size as (cols, rows). Displays that can not be read
+    are logged and skipped.
+    """
+    settings = []
+    for entry in text.split(";"):
+        words = entry.split()
+        if not words:
+            continue
+        try:
+            display = dict(word.split("=", 1) for word in words[1:])
+            display["address"] = int(words[0], 16)
+            display["port"] = int(display.get("port", 1))
+            if "kettle" in display:
+                display["kettle"] = int(display["kettle"])
+            if "size" in display:
+                cols, rows = display["size"].lower().split("x")
+                display["size"] = (int(cols), int(rows))
+        except ValueError:
+            cbpi.app.logger.info("LCDDisplay  - can not read display: %s" % entry.strip())
+            continue
+        cols, rows = display.get("size", (20, 4))
+        if cols * rows > 80 and display.get("expander") != "MCP23017":
+            # the second controller needs the spare pin of the MCP23017
+            cbpi.app.logger.info("LCDDisplay  - %dx%d LCDs need expander=MCP23017: %s" % (cols, rows, entry.strip()))
+            continue
+        unknown = [key for key in display if key != "address" and key not in DISPLAY_SETTINGS]
+        if unknown:
+            cbpi.app.logger.info("LCDDisplay  - unknown settings %s of display: %s" % (unknown, entry.strip()))
+        if "mode" in display and display["mode"] not in DISPLAY_MODES:
+            # the display follows parameter LCD_Display_Mode instead
+            cbpi.app.logger.info("LCDDisplay  - unknown mode %s of display: %s" % (display.pop("mode"), entry.strip()))
+        settings.append(display)
+    return settings
+
+
+def set_interfaces():
+    interfaces = cbpi.get_config_parameter('LCD_Interfaces', None)
+    if interfaces is None:
+        cbpi.add_config_parameter('LCD_Interfaces', 'wlan0,eth0,enxb827eb488a6e', 'string',
+                                  'Network interfaces for the IP in standby, comma separated, the first connected '
+                                  'one is shown, NO! CBPi reboot required')
+        interfaces = cbpi.get_config_parameter('LCD_Interfaces', None)
+        cbpi.app.logger.info("LCDDisplay  - set_interfaces added: %s" % interfaces)
+    return [interface.strip() for interface in str(interfaces).split(',') if interface.strip()]
+
+
+def set_version_path():
+    path = cbpi.get_config_parameter('LCD_Version_Path', None)
+    if path is None:
+        cbpi.add_config_parameter('LCD_Version_Path', VERSION_PATH, 'string',
+                                  'Path of the CraftBeerPi version.yaml shown in standby, NO! CBPi reboot required')
+        path = cbpi.get_config_parameter('LCD_Version_Path', None)
+        cbpi.app.logger.info("LCDDisplay  - set_version_path added: %s" % path)
+    return path
+
+
+class ConfigSnapshot(object):
+    """
+    Parameters used by the lcdjob, read once and held in memory.
+    They are reloaded when CraftBeerPi reports a changed parameter or at
+    the latest after CONFIG_TTL seconds.
+    """
+
+    def __init__(self, ttl=CONFIG_TTL):
+        self.ttl = ttl
+        self.reload()
+
+    def reload(self):
+        self.refresh_time = float(set_parameter_refresh())
+        self.lcd_mode = str(set_parameter_lcd_display_mode())
+        self.sensortype = set_sensortype_for_sensor_mode()
+        self.kettle_id = int(set_parameter_id1())
+        self.brewery_name = cbpi.get_config_parameter("brewery_name", "No Brewery")
+        self.interfaces = set_interfaces()
+        self.version_path = str(set_version_path())
+        self.event_driven = str(set_redraw_mode()) == "Events"
+        self.loaded_at = time.time()
+
+    def invalidate(self, *args, **kwargs):
+        self.loaded_at = 0
+
+    def current(self):
+        if time.time() - self.loaded_at > self.ttl:
+            self.reload()
+            if DEBUG: cbpi.app.logger.info("LCDDisplay  - parameters reloaded")
+        return self
+
+
+def hook_api(name, callback, *keys):
+    """
+    Wrap the cbpi api method ``name`` so that ``callback`` is called with the
+    same arguments after every call. If ``keys`` are given, only calls whose
+    first argument is one of them are passed on. Returns False if the method
+    does not exist in this CraftBeerPi version.
+    """
+    original = getattr(cbpi, name, None)
+    if original is None:
+        return False
+
+    def wrapper(*args, **kwargs):
+        result = original(*args, **kwargs)
+        if not keys or (args and args[0] in keys):
+            try:
+                callback(*args, **kwargs)
+            except Exception as e:
+                cbpi.app.logger.info("LCDDisplay  - hook %s exception: %s" % (name, e))
+        return result
+
+    setattr(cbpi, name, wrapper)
+    return True
+
+
+class InterfaceMonitor(object):
+    """
+    Address of the first connected network interface. It is looked up with
+    a single socket every IP_REFRESH seconds or when the interfaces change,
+    not on every tick.
+    """
+
+    def __init__(self, interval=IP_REFRESH):
+        self.interval = interval
+        self.interfaces = []
+        self.ip = 'Not connected'
+        self.resolved_at = 0
+
+    def address(self, interfaces):
+        if interfaces != self.interfaces or time.time() - self.resolved_at > self.interval:
+            self.interfaces = list(interfaces)
+            self.refresh()
+        return self.ip
+
+    def refresh(self):
         ip = 'Not connected'
-    pass
-    return ip
+        so = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for interface in self.interfaces:
+                ip = get_ip(interface, so)
+                if ip != 'Not connected':
+                    break
+        finally:
+            so.close()
+        if DEBUG: cbpi.app.logger.info("LCDDisplay  - ip refreshed: %s" % ip)
+        self.ip = ip
+        self.resolved_at = time.time()
 
 
-def get_ip(interface):
-    ip_addr = "Not Connected"
-    so = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+ip_monitor = InterfaceMonitor()
+
+
+def set_ip(interfaces):
+    return ip_monitor.address(interfaces)
+
+
+def get_ip(interface, so=None):
+    ip_addr = "Not connected"
+    own_socket = so is None
+    if own_socket:
+        so = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
+        # SIOCGIFADDR
         ip_addr = socket.inet_ntoa(fcntl.ioctl(so.fileno(), 0x8915, struct.pack('256s', bytes(interface.encode())[:15]))[20:24])
+    except (IOError, OSError):
+        pass  # interface does not exist or has no address
     finally:
-        pass
+        if own_socket:
+            so.close()
     return ip_addr
 
 
 def get_version_fo(path):
     version = ""
     try:
-        if path is not "":
+        if path != "":
             fo = open(path, "r")
         else:
-            fo = open("/home/pi/craftbeerpi3/config/version.yaml", "r")
+            fo = open(VERSION_PATH, "r")
         version = fo.read()
         fo.close()
     finally:
         return version
 
 
-def get_next_hop_timer(active_step, time_left):
-    hop_timers = []
-    if active_step.name == 'Boil' and active_step.timer_end is not None:
-        # cbpi.app.logger.info("LCDDisplay  - get_next_hop_timer %s " % active_step.type)
-        for x in range(1, 6):
-            try:
-                # Step config: {"hop_1": "89", "hop_1_added": null, "hop_2": "88", "hop_2_added": null, "hop_3": "87",
-                # "hop_3_added": null, "hop_4": "86", "hop_4_added": null, "hop_5": "85", "hop_5_added": null,
-                # "kettle": "1", "temp": "100", "timer": 90, "timer_end": null}
-                hop = int(getattr(active_step, ('hop_' + str(x)))) * 60
-            except:
-                hop = None
-            if hop is not None:
-                hop_left = time_left - hop
-                if hop_left > 0:
-                    hop_timers.append(hop_left)
-                    if DEBUG: cbpi.app.logger.info("LCDDisplay  - get_next_hop_timer %s %s" % (x, str(hop_timers)))
-                pass
-            pass
-        pass
-    pass
-
-    if len(hop_timers) != 0:
-        next_hop_timer = time.strftime("%H:%M:%S", time.gmtime(min(hop_timers)))
-    else:
-        next_hop_timer = None
-    return next_hop_timer
-    pass
+class VersionCache(object):
+    """
+    CraftBeerPi version held in memory. The file is only read again when
+    its path or modification time changes, so upgrades still show up.
+    """
 
+    def __init__(self):
+        self.path = None
+        self.mtime = None
+        self.version = ""
 
-def show_multidisplay(refresh, charmap):
-    s = cbpi.cache.get("active_step")
-    for idx, value in cbpi.cache["kettle"].items():
-        current_sensor_value = (cbpi.get_sensor_value(value.sensor))
+    def get(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if path != self.path or mtime != self.mtime:
+            self.version = get_version_fo(path)
+            self.path = path
+            self.mtime = mtime
+            if DEBUG: cbpi.app.logger.info("LCDDisplay  - version file read: %s" % self.version)
+        return self.version
 
-        heater_of_kettle = int(cbpi.cache.get("kettle").get(value.id).heater)
-        heater_status = int(cbpi.cache.get("actors").get(heater_of_kettle).state)
 
-        next_hop_alert = None
-        if s.name == 'Boil' and s.timer_end is not None:
-            time_left = (s.timer_end - time.time())
-            next_hop_alert = get_next_hop_timer(s, time_left)
-        pass
+version_cache = VersionCache()
 
-        # put together line1
-        line1 = (u'%s' % (cbidecode(s.name, charmap))[:20])
 
-        # put together line2, if steptimer is running show remaining time and kettlename
-        try:
-            if s.timer_end is not None:
-                time_remaining = time.strftime(u"%H:%M:%S", time.gmtime(s.timer_end - time.time()))
-                line2 = ((u"%s %s" % (cbidecode(value.name, charmap).ljust(12)[:11], time_remaining)).ljust(20)[:20])
-            else:
-                line2 = (u'%s' % cbidecode(value.name, charmap))[:20]
-        except:
-            line2 = u"no kettle name"
-            pass
+class FermenterTaskIndex(object):
+    """
+    Fermenter steps indexed by fermenter id, so the fermentation mode does not
+    scan all steps for every fermenter. The index is rebuilt when CraftBeerPi
+    reports a changed fermenter, when the number of steps changes or at the
+    latest after FERMENTER_TTL seconds.
+    """
 
-        # put together line3 and line 4
-        if s.name != 'Boil':
-            line3 = (u"Targ. Temp:%6.2f%s%s" % (float(value.target_temp), u"°", lcd_unit))[:20]
+    def __init__(self, ttl=FERMENTER_TTL):
+        self.ttl = ttl
+        self.tasks = {}
+        self.any_active = False
+        self.size = None
+        self.built_at = 0
+
+    def rebuild(self, fermenter_tasks):
+        tasks = {}
+        any_active = False
+        for key, task in fermenter_tasks.items():
+            # INFO task = modules.fermenter.FermenterStep
+            if task.state == "A":
+                any_active = True
+            if task.timer_start is None:
+                continue
+            # the active step wins, else the last step with a timer like the old scan
+            shown = tasks.get(task.fermenter_id)
+            if task.state == "A" or shown is None or shown.state != "A":
+                tasks[task.fermenter_id] = task
+        self.tasks = tasks
+        self.any_active = any_active
+        self.size = len(fermenter_tasks)
+        self.built_at = time.time()
+        if DEBUG: cbpi.app.logger.info("LCDDisplay  - fermenter steps indexed: %s" % list(tasks.keys()))
+
+    def invalidate(self, *args, **kwargs):
+        self.built_at = 0
+
+    def current(self):
+        fermenter_tasks = cbpi.cache.get("fermenter_task") or {}
+        if len(fermenter_tasks) != self.size or time.time() - self.built_at > self.ttl:
+            self.rebuild(fermenter_tasks)
+        return self
+
+    def get(self, fermenter_id):
+        # step of the fermenter whose remaining time is shown, or None
+        return self.tasks.get(fermenter_id)
+
+
+fermenter_tasks = FermenterTaskIndex()
+
+
+class HopSchedule(object):
+    """
+    Hop additions of the Boil step as sorted times, parsed once when the step
+    timer starts. The next addition is found with a bisect, so there may be
+    any number of hop_x parameters.
+    """
 
-            # line4 needs error handling because there may be temp value without
-            # sensor dates and so it is none and than an error is thrown
+    def __init__(self):
+        self.key = None
+        self.times = []
+
+    def get(self, active_step):
+        key = (getattr(active_step, "id", None), active_step.timer_end)
+        if key != self.key:
+            self.times = self.parse(active_step)
+            self.key = key
+        return self.times
+
+    def parse(self, active_step):
+        # Step config: {"hop_1": "89", "hop_1_added": null, "hop_2": "88", "hop_2_added": null, "hop_3": "87",
+        # "hop_3_added": null, "hop_4": "86", "hop_4_added": null, "hop_5": "85", "hop_5_added": null,
+        # "kettle": "1", "temp": "100", "timer": 90, "timer_end": null}
+        times = []
+        x = 1
+        while hasattr(active_step, 'hop_%d' % x):
             try:
-                line4 = (u"Curr. Temp:%6.2f%s%s" % (float(current_sensor_value), u"°", lcd_unit))[:20]
-            except:
-                cbpi.app.logger.info("LCDDisplay  - current_sensor_value exception %s" % current_sensor_value)
-                line4 = (u"Curr. Temp: %s" % "No Data")[:20]
-        else:
-            try:
-                line3 = (u"Set|Act:%4.0f°%5.1f%s%s" % (float(value.target_temp), float(current_sensor_value), u"°", lcd_unit))[:20]
-            except:
-                cbpi.app.logger.info("LCDDisplay  - current_sensor_value exception %s" % current_sensor_value)
-                line3 = (u"Set|Act:%4.0f° N/A %s%s" % (float(value.target_temp), u"°", lcd_unit))[:20]
-            if next_hop_alert is not None:
-                line4 = (u"Add Hop in: %s" % next_hop_alert)[:20]
-            else:
-                line4 = u"                    "[:20]
-
-        lcd._set_cursor_mode('hide')
-        lcd.clear()
-        lcd.cursor_pos = (0, 0)
-        lcd.write_string(line1)
-        lcd.cursor_pos = (0, 19)
-        if heater_status != 0:
-            lcd.write_string(u"\x00")
-        lcd.cursor_pos = (1, 0)
-        lcd.write_string(line2)
-        lcd.cursor_pos = (2, 0)
-        lcd.write_string(line3)
-        lcd.cursor_pos = (3, 0)
-        lcd.write_string(line4)
-        time.sleep(refresh)
-    pass
+                times.append(active_step.timer_end - int(getattr(active_step, 'hop_%d' % x)) * 60)
+            except (TypeError, ValueError):
+                pass  # hop addition not used
+            x += 1
+        times.sort()
+        if DEBUG: cbpi.app.logger.info("LCDDisplay  - hop schedule %s" % times)
+        return times
 
 
-def show_singlemode(kettleid1, charmap):
-    s = cbpi.cache.get("active_step")
-    # read the current temperature of kettle with kettleid1 from parameters
-    current_sensor_value_id1 = (cbpi.get_sensor_value(int(cbpi.cache.get("kettle").get(kettleid1).sensor)))
+hop_schedule = HopSchedule()
 
-    # read the target temperature of kettle with kettleid1 from parameters
-    target_temp = (float(cbpi.cache.get("kettle")[kettleid1].target_temp))
 
-    # get the state of the heater of the current kettle
-    heater_of_kettle = int(cbpi.cache.get("kettle").get(kettleid1).heater)
-    # cbpi.app.logger.info("LCDDisplay  - heater id %s" % (heater_of_kettle))
+def get_next_hop_timer(active_step, time_left):
+    next_hop_timer = None
+    if active_step.name == 'Boil' and active_step.timer_end is not None:
+        times = hop_schedule.get(active_step)
+        now = active_step.timer_end - time_left
+        i = bisect_right(times, now)
+        if i < len(times):
+            next_hop_timer = time.strftime("%H:%M:%S", time.gmtime(times[i] - now))
+    return next_hop_timer
 
-    heater_status = cbpi.cache.get("actors").get(heater_of_kettle).state
-    # cbpi.app.logger.info("LCDDisplay  - heater status (0=off, 1=on) %s" % (heater_status))
 
-    next_hop_alert = None
-    if s.name == 'Boil' and s.timer_end is not None:
-        time_left = (s.timer_end - time.time())
-        next_hop_alert = get_next_hop_timer(s, time_left)
-    pass
+def render(display, layout, values, page=None):
+    # layouts are compiled once for the charmap of the LCD and every page, e.g. kettle, that shows them.
+    # rendering only encodes changed fields and takes the values of clocks and timers when they are due
+    compiled = display.compiled_layouts.get((layout, page))
+    if compiled is None:
+        compiled = display.compiled_layouts[(layout, page)] = layout.compile(display.lcd.codec)
+    rows = compiled.render(values)
+    display.next_redraw = compiled.next_due()
+    return rows
 
-    # line1 the stepname
-    line1 = (u'%s' % (cbidecode(s.name, charmap)).ljust(20)[:20])
 
-    # line2 when steptimer is running show remaining time and kettlename
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def kettle_layout(s):
+    if s.name == 'Boil':
+        return BOIL_TIMER_LAYOUT if s.timer_end is not None else BOIL_LAYOUT
+    return MASH_TIMER_LAYOUT if s.timer_end is not None else MASH_LAYOUT
+
+
+def kettle_values(s, kettle, current_sensor_value, charmap):
+    # values for the fields of the kettle layouts, the heater symbol is added by the caller
+    current = to_float(current_sensor_value)
+    if current is None:
+        # there may be a sensor without a value
+        cbpi.app.logger.info("LCDDisplay  - current_sensor_value exception %s" % current_sensor_value)
+    values = {
+        "step": s.name,
+        "kettle": kettle.name,
+        "target": to_float(kettle.target_temp),
+        "current": current,
+        "unit": lcd_unit,
+    }
     if s.timer_end is not None:
-        time_remaining = time.strftime(u"%H:%M:%S", time.gmtime(s.timer_end - time.time()))
-        line2 = ((u"%s %s" % (
-            cbidecode(cbpi.cache.get("kettle")[kettleid1].name, charmap).ljust(12)[:11], time_remaining)).ljust(20)[
-                 :20])
-    else:
-        line2 = ((u'%s' % (cbidecode(cbpi.cache.get("kettle")[kettleid1].name, charmap))).ljust(20)[:20])
+        # timers are only formatted when the next second is due
+        values["remaining"] = lambda: time.strftime(u"%H:%M:%S", time.gmtime(s.timer_end - time.time()))
+        if s.name == 'Boil':
+            values["hop"] = lambda: next_hop_text(s)
+    return values
 
-    # line3
-    if s.name != 'Boil':
-        line3 = (u"Targ. Temp:%6.2f%s%s" % (float(target_temp), u"°", lcd_unit)).ljust(20)[:20]
 
-        # line4 needs error handling because there may be temp value without
-        # sensor dates and so it is none and than an error is thrown
-        try:
-            line4 = (u"Curr. Temp:%6.2f%s%s" % (float(current_sensor_value_id1), u"°", lcd_unit)).ljust(20)[:20]
+def next_hop_text(s):
+    next_hop_alert = get_next_hop_timer(s, s.timer_end - time.time())
+    return (u"Add Hop in: %s" % next_hop_alert) if next_hop_alert is not None else u""
 
-        except Exception as e:
-            cbpi.app.logger.info(
-                "LCDDisplay  - single mode current_sensor_value_id1 exception %s" % current_sensor_value_id1)
-            cbpi.app.logger.info(
-                "LCDDisplay  - single mode current_sensor_value_id1 exception %s" % e)
-            line4 = (u"Curr. Temp: %s" % "No Data")[:20]
+
+@contextmanager
+def render_timer(screen):
+    # the time to build a frame of the screen goes into the statistics, if they are on
+    if lcd_stats is None:
+        yield
     else:
-        try:
-            line3 = (u"Set|Act:%4.0f|%5.1f%s%s" % (float(target_temp), float(current_sensor_value_id1), u"°", lcd_unit))[:20]
-        except:
-            cbpi.app.logger.info("LCDDisplay  - current_sensor_value exception %s" % current_sensor_value_id1)
-            line3 = (u"Set|Act:%4.0f| N/A %s%s" % (float(target_temp), u"°", lcd_unit))[:20]
-        if next_hop_alert is not None:
-            line4 = (u"Add Hop in: %s" % next_hop_alert)[:20]
-        else:
-            line4 = u"                    "[:20]
-
-    lcd._set_cursor_mode('hide')
-    lcd.cursor_pos = (0, 0)
-    lcd.write_string(line1)
-    lcd.cursor_pos = (0, 19)
-    global BLINK
-    if BLINK is False and heater_status != 0:
-        lcd.write_string(u"\x00")
-        BLINK = True
+        with lcd_stats.timed("render." + screen):
+            yield
+
+
+def show_page(display, screen, build, args, refresh):
+    """
+    Show the page returned by build(display, *args) for refresh seconds. The page is built again when a clock
+    or timer on it is due and, with event driven redraws, whenever a sensor or actor changes.
+    Returns False if another display mode was selected.
+    """
+    page_end = time.time() + refresh
+    while True:
+        with render_timer(screen):
+            frame = build(display, *args)
+        display.submit(frame)
+        next_redraw = display.next_redraw
+        wake_up = page_end if next_redraw is None else min(page_end, next_redraw)
+        result = scheduler.wait_update(max(wake_up - time.time(), 0))
+        if result == SWITCHED:
+            return False
+        if result == TIMEOUT and time.time() >= page_end:
+            return True
+
+
+def show_multidisplay(display, refresh, charmap):
+    kettles = list(cbpi.cache["kettle"].values())
+    if display.lcd.lcd.cols >= WIDE_COLS:
+        # a 40x4 LCD shows four kettles at once, pages only change if there are more
+        build = wide_multidisplay_page
+        pages = [kettles[i:i + WIDE_KETTLES] for i in range(0, len(kettles), WIDE_KETTLES)]
     else:
-        lcd.write_string(u" ")
-        BLINK = False
-    lcd.cursor_pos = (1, 0)
-    lcd.write_string(line2)
-    lcd.cursor_pos = (2, 0)
-    lcd.write_string(line3)
-    lcd.cursor_pos = (3, 0)
-    lcd.write_string(line4)
+        build = multidisplay_page
+        pages = kettles
+    for page in pages:
+        if not show_page(display, "show_multidisplay", build, (page, charmap), refresh):
+            return  # another display mode was selected
+    pass
 
 
-def show_sensor_type(sensortype, refresh_time=2.0, charmap="A00"):
+def multidisplay_page(display, kettle, charmap):
+    s = cbpi.cache.get("active_step")
+    values = kettle_values(s, kettle, cbpi.get_sensor_value(kettle.sensor), charmap)
+
+    heater_status = int(cbpi.cache.get("actors").get(int(kettle.heater)).state)
+    values["heater"] = BEERGLASS if heater_status != 0 else u" "
+    values["sep"] = u"°"
+    return render(display, kettle_layout(s), values, kettle.id)
+
+
+def wide_multidisplay_page(display, kettles, charmap):
+    s = cbpi.cache.get("active_step")
+    values = {"unit": lcd_unit}
+    for i, kettle in enumerate(kettles):
+        kettle_vals = kettle_values(s, kettle, cbpi.get_sensor_value(kettle.sensor), charmap)
+        values["kettle%d" % i] = kettle_vals["kettle"]
+        values["target%d" % i] = kettle_vals["target"]
+        values["current%d" % i] = kettle_vals["current"]
+        heater_status = int(cbpi.cache.get("actors").get(int(kettle.heater)).state)
+        values["heater%d" % i] = BEERGLASS if heater_status != 0 else u" "
+        # the timer of the step is the same for all kettles
+        values["remaining"] = kettle_vals.get("remaining")
+    layout = WIDE_KETTLE_LAYOUTS[(len(kettles), s.timer_end is not None)]
+    return render(display, layout, values, tuple(kettle.id for kettle in kettles))
+
+
+def show_singlemode(display, kettleid1, charmap):
+    with render_timer("show_singlemode"):
+        s = cbpi.cache.get("active_step")
+        kettle = cbpi.cache.get("kettle")[kettleid1]
+        # read the current temperature of kettle with kettleid1 from parameters
+        values = kettle_values(s, kettle, cbpi.get_sensor_value(int(kettle.sensor)), charmap)
+
+        # get the state of the heater of the current kettle, the beerglass blinks while heating
+        heater_status = cbpi.cache.get("actors").get(int(kettle.heater)).state
+        if display.blink is False and heater_status != 0:
+            values["heater"] = BEERGLASS
+            display.blink = True
+        else:
+            values["heater"] = u" "
+            display.blink = False
+        values["sep"] = u"|"
+        frame = render(display, kettle_layout(s), values)
+    display.submit(frame)
+    # the blinking beerglass needs the next tick, otherwise wait for the next second of the timer
+    if heater_status != 0:
+        return None
+    return display.next_redraw
+
+
+def show_sensor_type(display, sensortype, refresh_time=2.0, charmap="A00"):
     # SensorTYPE can be "eManometer", "ONE_WIRE_SENSOR", "PHSensor", "SystemTempSensor", "MQTT_SENSOR", etc.
     all_obj_sensor = cbpi.cache["sensors"]
 
@@ -415,31 +824,8 @@ def show_sensor_type(sensortype, refresh_time=2.0, charmap="A00"):
             obj_sensor = cbpi.cache["sensors"][key]
             sensor_type = obj_sensor.type
             if sensor_type == sensortype:
-                current_sensor_value = str(cbpi.get_sensor_value(key))
-                sensor_name = obj_sensor.name
-                sensor_config = obj_sensor.config
-                sensor_with_value = ('"ID": "%s", "type": "%s", "name": "%s", "value": "%s", "config": %s' % (
-                    key, sensor_type, sensor_name, current_sensor_value, sensor_config))
-                if DEBUG: cbpi.app.logger.info(
-                    'LCDDisplay  - search_sensor_type: sensor_with_value: %s' % sensor_with_value)
-                line1 = u'CBPi3 LCD Sensormode'
-                line2 = u'--------------------'
-                if DEBUG: cbpi.app.logger.info('LCDDisplay  - search_sensor_type: line1: %s' % line2)
-                line3 = (u'%s' % (cbidecode(sensor_name, charmap)).ljust(20)[:20])
-                if DEBUG: cbpi.app.logger.info('LCDDisplay  - search_sensor_type: line1: %s' % line3)
-                line4 = (u'%s' % (cbidecode(current_sensor_value, charmap)).ljust(20)[:20])
-                if DEBUG: cbpi.app.logger.info('LCDDisplay  - search_sensor_type: line2: %s' % line4)
-
-                lcd.clear()
-                lcd.cursor_pos = (0, 0)
-                lcd.write_string(line1)
-                lcd.cursor_pos = (1, 0)
-                lcd.write_string(line2)
-                lcd.cursor_pos = (2, 0)
-                lcd.write_string(line3)
-                lcd.cursor_pos = (3, 0)
-                lcd.write_string(line4)
-                time.sleep(refresh_time)
+                if not show_page(display, "show_sensor_type", sensor_page, (key, charmap), refresh_time):
+                    return  # another display mode was selected
             pass
         except Exception as e:
             cbpi.app.logger.info('LCDDisplay  - search_sensor  - exception: %s' % e)
@@ -447,144 +833,169 @@ def show_sensor_type(sensortype, refresh_time=2.0, charmap="A00"):
     pass
 
 
-def show_fermentation_multidisplay(refresh, charmap):
+def sensor_page(display, key, charmap):
+    obj_sensor = cbpi.cache["sensors"][key]
+    current_sensor_value = str(cbpi.get_sensor_value(key))
+    if DEBUG: cbpi.app.logger.info('LCDDisplay  - search_sensor_type: "ID": "%s", "type": "%s", "name": "%s", '
+                                   '"value": "%s", "config": %s' % (key, obj_sensor.type, obj_sensor.name,
+                                                                    current_sensor_value, obj_sensor.config))
+    return render(display, SENSOR_LAYOUT, {
+        "name": obj_sensor.name,
+        "value": current_sensor_value,
+    }, key)
+
+
+def show_fermentation_multidisplay(display, refresh, charmap):
+    fermenter_tasks.current()
     for idx, value in cbpi.cache["fermenter"].items():
-        current_sensor_value = (cbpi.get_sensor_value(value.sensor))
-        # INFO value = modules.fermenter.Fermenter
-        # INFO FermenterId = modules.fermenter.Fermenter.id
-        gravity_sensor = False
-        try:
-            sensor2_of_fermenter = int(cbpi.cache.get("fermenter").get(value.id).sensor2)
-            sensor2_type = cbpi.cache.get("sensors").get(sensor2_of_fermenter).type
-            # print("Sensor Type %s" % sensor2_type)
-            # cbpi.app.logger.info("LCDDisplay  - Ferm. Sensor Type %s" % sensor2_type)
-            if sensor2_type == "iSpindel":
-                sensor2_data_type = cbpi.cache.get("sensors").get(sensor2_of_fermenter).config["sensorType"]
-                # print("Sensor2 Data Type %s" % sensor2_data_type)
-                if sensor2_data_type == "Gravity":
-                    sensor2_data_unit = cbpi.cache.get("sensors").get(sensor2_of_fermenter).config["unitsGravity"]
-                    # print("Sensor2 Units: %s" % sensor2_data_unit)
-                    gravity_sensor = True
-                    try:
-                        current_gravity_value = (cbpi.get_sensor_value(value.sensor2))
-                    except:
-                        current_gravity_value = None
-        except:
-            current_gravity_value = None
-
-        # get the state of the heater of the current fermenter, if there is none, except takes place
-        try:
-            heater_of_fermenter = int(cbpi.cache.get("fermenter").get(value.id).heater)
-            # cbpi.app.logger.info("LCDDisplay  - fheater id %s" % (heater_of_fermenter))
+        if not show_page(display, "show_fermentation_multidisplay", fermentation_page, (value, charmap), refresh):
+            return  # another display mode was selected
+    pass
 
-            fheater_status = int(cbpi.cache.get("actors").get(heater_of_fermenter).state)
-            # cbpi.app.logger.info("LCDDisplay  - fheater status (0=off, 1=on) %s" % (fheater_status))
-        except:
-            fheater_status = 0
 
-        # get the state of the cooler of the current fermenter, if there is none, except takes place
+def fermentation_page(display, value, charmap):
+    current_sensor_value = (cbpi.get_sensor_value(value.sensor))
+    # INFO value = modules.fermenter.Fermenter
+    # INFO FermenterId = modules.fermenter.Fermenter.id
+    gravity_sensor = False
+    try:
+        sensor2_of_fermenter = int(cbpi.cache.get("fermenter").get(value.id).sensor2)
+        sensor2_type = cbpi.cache.get("sensors").get(sensor2_of_fermenter).type
+        # print("Sensor Type %s" % sensor2_type)
+        # cbpi.app.logger.info("LCDDisplay  - Ferm. Sensor Type %s" % sensor2_type)
+        if sensor2_type == "iSpindel":
+            sensor2_data_type = cbpi.cache.get("sensors").get(sensor2_of_fermenter).config["sensorType"]
+            # print("Sensor2 Data Type %s" % sensor2_data_type)
+            if sensor2_data_type == "Gravity":
+                sensor2_data_unit = cbpi.cache.get("sensors").get(sensor2_of_fermenter).config["unitsGravity"]
+                # print("Sensor2 Units: %s" % sensor2_data_unit)
+                gravity_sensor = True
+                try:
+                    current_gravity_value = (cbpi.get_sensor_value(value.sensor2))
+                except:
+                    current_gravity_value = None
+    except:
+        current_gravity_value = None
 
-        try:
-            cooler_of_fermenter = int(cbpi.cache.get("fermenter").get(value.id).cooler)
-            # cbpi.app.logger.info("LCDDisplay  - fcooler id %s" % (cooler_of_fermenter))
+    # get the state of the heater of the current fermenter, if there is none, except takes place
+    try:
+        heater_of_fermenter = int(cbpi.cache.get("fermenter").get(value.id).heater)
+        # cbpi.app.logger.info("LCDDisplay  - fheater id %s" % (heater_of_fermenter))
 
-            fcooler_status = int(cbpi.cache.get("actors").get(cooler_of_fermenter).state)
-            # cbpi.app.logger.info("LCDDisplay  - fcooler status (0=off, 1=on) %s" % (fcooler_status))
-        except:
-            fcooler_status = 0
-        pass
+        fheater_status = int(cbpi.cache.get("actors").get(heater_of_fermenter).state)
+        # cbpi.app.logger.info("LCDDisplay  - fheater status (0=off, 1=on) %s" % (fheater_status))
+    except:
+        fheater_status = 0
 
-        # put together line1
-        line1 = (u'%s' % (cbidecode(value.brewname, charmap))[:20])
-
-        # put together line2
-        z = 0
-        # todo: line2 = u"no fermenter name"
-        for key, value1 in cbpi.cache["fermenter_task"].items():
-            # INFO value1 = modules.fermenter.FermenterStep
-            # cbpi.app.logger.info("LCDDisplay  - value1 %s" % (value1.fermenter_id))
-            if value1.timer_start is not None and value1.fermenter_id == value.id:
-                line2 = interval(cbidecode(value.name, charmap), (value1.timer_start - time.time()))
-                z = 1
-            elif z == 0:
-                line2 = (u'%s' % (cbidecode(value.name, charmap))[:20])
-            pass
+    # get the state of the cooler of the current fermenter, if there is none, except takes place
 
-        # put together line3
-        try:
-            line3 = (u"Set|Act:%5.1f°%4.1f%s%s" % (float(value.target_temp), float(current_sensor_value), u"°", lcd_unit))[:20]
-        except:
-            cbpi.app.logger.info("LCDDisplay  - fermentmode gravity sensor current_sensor_value exception %s" % current_sensor_value)
-            line3 = (u"Set|Act:%5.1f° N/A %s%s" % (float(value.target_temp), u"°", lcd_unit))[:20]
-
-        # put together line4
-        # needs error handling because there may be tempvalue without sensor dates and
-        # so it is none and than an error is thrown
-        if gravity_sensor is True:
-            if current_gravity_value is not None and current_gravity_value != 0:
-                if sensor2_data_unit is not "SG":
-                    line4 = (u"Gravity:%4.1f%s" % (float(current_gravity_value), sensor2_data_unit))[:20]
-                else:
-                    line4 = (u"Gravity:%5.3f%s" % (float(current_gravity_value), sensor2_data_unit))[:20]
-                pass
-            else:
-                line4 = u"waiting for iSpindel"[:20]
-        else:
-            line4 = u"                    "[:20]
-        pass
+    try:
+        cooler_of_fermenter = int(cbpi.cache.get("fermenter").get(value.id).cooler)
+        # cbpi.app.logger.info("LCDDisplay  - fcooler id %s" % (cooler_of_fermenter))
 
-        lcd._set_cursor_mode('hide')
-        lcd.clear()
-        lcd.cursor_pos = (0, 0)
-        lcd.write_string(line1)
-        lcd.cursor_pos = (0, 17)
-        if fheater_status != 0:
-            lcd.write_string(u"\x00")
-        if fcooler_status != 0:
-            lcd.write_string(u"\x01\x01\x01")
-        lcd.cursor_pos = (1, 0)
-        lcd.write_string(line2)
-        lcd.cursor_pos = (2, 0)
-        lcd.write_string(line3)
-        lcd.cursor_pos = (3, 0)
-        lcd.write_string(line4)
-
-        time.sleep(refresh)
+        fcooler_status = int(cbpi.cache.get("actors").get(cooler_of_fermenter).state)
+        # cbpi.app.logger.info("LCDDisplay  - fcooler status (0=off, 1=on) %s" % (fcooler_status))
+    except:
+        fcooler_status = 0
     pass
 
-
-def is_fermenter_step_running():
-    for key, value2 in cbpi.cache["fermenter_task"].items():
-        if value2.state == "A":
-            return "active"
+    # put together line2, the remaining time of a running step is shown next to the fermenter name
+    fermenter = value.name
+    task = fermenter_tasks.get(value.id)
+    if task is not None and task.timer_start is not None:
+        timer_start = task.timer_start
+        fermenter = lambda name=fermenter: interval(name, (timer_start - time.time()))
+
+    current = to_float(current_sensor_value)
+    if current is None:
+        cbpi.app.logger.info("LCDDisplay  - fermentmode current_sensor_value exception %s" % current_sensor_value)
+
+    # put together line4
+    # needs error handling because there may be tempvalue without sensor dates and
+    # so it is none and than an error is thrown
+    gravity = u""
+    if gravity_sensor is True:
+        if current_gravity_value is not None and current_gravity_value != 0:
+            if sensor2_data_unit != "SG":
+                gravity = u"Gravity:%4.1f%s" % (float(current_gravity_value), sensor2_data_unit)
+            else:
+                gravity = u"Gravity:%5.3f%s" % (float(current_gravity_value), sensor2_data_unit)
         else:
-            pass
+            gravity = u"waiting for iSpindel"
+
+    symbols = u""
+    if fheater_status != 0:
+        symbols += BEERGLASS
+    if fcooler_status != 0:
+        symbols += ICE * 3
+    return render(display, FERMENTER_LAYOUT, {
+        "brew": value.brewname,
+        "symbols": symbols,
+        "fermenter": fermenter,
+        "target": to_float(value.target_temp),
+        "current": current,
+        "unit": lcd_unit,
+        "gravity": gravity,
+    }, value.id)
 
 
-def show_standby(ipdet, cbpi_version, charmap):
-    lcd._set_cursor_mode('hide')
-    lcd.cursor_pos = (0, 0)
-    lcd.write_string((u"CraftBeerPi %s" % cbpi_version).ljust(20))
-    lcd.cursor_pos = (1, 0)
-    lcd.write_string(
-        (u"%s" % (cbidecode(cbpi.get_config_parameter("brewery_name", "No Brewery"), charmap))).ljust(20)[:20])
-    lcd.cursor_pos = (2, 0)
-    lcd.write_string((u"IP: %s" % ipdet).ljust(20)[:20])
-    lcd.cursor_pos = (3, 0)
-    lcd.write_string((strftime(u"%Y-%m-%d %H:%M:%S", time.localtime())).ljust(20))
-    pass
-
+def is_fermenter_step_running():
+    if fermenter_tasks.current().any_active:
+        return "active"
+
+
+def show_standby(display, ipdet, cbpi_version, charmap):
+    # the version file may end with a line break, which has no place in a frame
+    with render_timer("show_standby_screen"):
+        frame = render(display, STANDBY_LAYOUT, {
+            "version": u" ".join(cbpi_version.split()),
+            "brewery": config.brewery_name,
+            "ip": ipdet,
+            "clock": lambda: strftime(u"%Y-%m-%d %H:%M:%S", time.localtime()),
+        })
+    display.submit(frame)
+
+
+def show_standby_screen(display, charmap):
+    cfg = config.current()
+    ip = set_ip(cfg.interfaces)
+    cbpi_version = version_cache.get(cfg.version_path)
+    show_standby(display, ip, cbpi_version, charmap)
+    if DEBUG: cbpi.app.logger.info('LCDDisplay  - show_standby  ip: %s, ver: %s, Charmap: %s' % (ip, cbpi_version, charmap))
+    # the scheduler wakes up again when the clock shows the next second
+    return display.next_redraw
+
+
+def select_mode(display, cfg, stepname, tick):
+    # settings of the display come first, then the parameters
+    lcd_mode = display.mode or cfg.lcd_mode
+    kettle_id = display.kettle_id if display.kettle_id is not None else cfg.kettle_id
+    sensortype = display.sensortype or cfg.sensortype
+    refresh_time = cfg.refresh_time
+    charmap = display.charmap
+
+    if stepname is not None and lcd_mode == "Multidisplay":
+        scheduler.select("Multidisplay", show_multidisplay, (display, refresh_time, charmap), display=display.name)
+
+    elif stepname is not None and lcd_mode == "Singledisplay":
+        scheduler.select("Singledisplay", show_singlemode, (display, kettle_id, charmap), interval=tick,
+                         display=display.name)
+
+    elif stepname is not None and lcd_mode == "Sensordisplay":
+        scheduler.select("Sensordisplay", show_sensor_type, (display, sensortype, refresh_time, charmap),
+                         interval=tick, display=display.name)
+
+    # a display in Fermentationdisplay mode shows the fermenters whether a step is running or not
+    elif lcd_mode == "Fermentationdisplay" and cbpi.cache.get("fermenter"):
+        scheduler.select("Fermentationdisplay", show_fermentation_multidisplay, (display, refresh_time, charmap),
+                         display=display.name)
+
+    elif is_fermenter_step_running() == "active":
+        scheduler.select("Fermentationdisplay", show_fermentation_multidisplay, (display, refresh_time, charmap),
+                         display=display.name)
 
-def cbidecode(string, charmap="A00"):  # Changes some german Letters to be displayed
-    if charmap == "A00":
-        if DEBUG: cbpi.app.logger.info('LCDDisplay  - string: %s' % string)
-        replaced_text = string.replace(u"Ä", u"\x02").replace(u"Ö", u"\x03").replace(u"Ü", u"\x04").replace(u"ß",
-                                                                                                            u"\x05")
-        if DEBUG: cbpi.app.logger.info('LCDDisplay  - replaced_text: %s' % replaced_text)
-        return replaced_text
     else:
-        return string
-    pass
+        scheduler.select("Standby", show_standby_screen, (display, charmap), interval=tick, display=display.name)
 
 
 def interval(fermentername, seconds):
@@ -631,36 +1042,52 @@ def init(cbpi):
     characters = str(set_charmap())
     cbpi.app.logger.info("LCDDisplay  - character map used %s" % characters)
 
-    # This is just for the logfile at start
-    refreshlog = float(set_parameter_refresh())
-    cbpi.app.logger.info('LCDDisplay  - Refreshrate %s' % refreshlog)
-
-    # This is just for the logfile at start
-    lcd_mode_log = str(set_parameter_lcd_display_mode())
-    cbpi.app.logger.info('LCDDisplay  - LCD-Display-Mode: %s' % lcd_mode_log)
-
-    # This is just for the logfile at start
-    # todo
-    l_lcd_sensormode_sensor = set_sensortype_for_sensor_mode()
-    cbpi.app.logger.info("LCDDisplay  - build all sensors list: %s" % l_lcd_sensormode_sensor)
-
-    # This is just for the logfile at start
-    id1log = int(set_parameter_id1())
-    cbpi.app.logger.info("LCDDisplay  - Kettlenumber used %s" % id1log)
-
-    global lcd
-    try:
-        lcd = lcd(LCDaddress, characters)
-        lcd.create_char(0, bierkrug)                # u"\x00"  -->beerglass symbol
-        lcd.create_char(1, cool)                    # u"\x01"  -->Ice symbol
-        lcd.create_char(2, awithdots)               # u"\x02"  -->Ä
-        lcd.create_char(3, owithdots)               # u"\x03"  -->Ö
-        lcd.create_char(4, uwithdots)               # u"\x04"  -->Ü
-        lcd.create_char(5, esszett)                 # u"\x05"  -->ß
-    except Exception as e:
-        cbpi.notify('LCD Address is wrong', 'Change LCD address in parameters, to detect address type in Raspi comand promt: sudo '
-                                            'i2cdetect -y 1', type='danger', timeout=None)
-        cbpi.app.logger.info("LCDDisplay  - wrong LCD address : %s" % e)
+    # The lcdjob reads its parameters from this snapshot instead of the config layer
+    global config
+    config = ConfigSnapshot()
+    cbpi.app.logger.info('LCDDisplay  - Refreshrate %s' % config.refresh_time)
+    cbpi.app.logger.info('LCDDisplay  - LCD-Display-Mode: %s' % config.lcd_mode)
+    cbpi.app.logger.info("LCDDisplay  - build all sensors list: %s" % config.sensortype)
+    cbpi.app.logger.info("LCDDisplay  - Kettlenumber used %s" % config.kettle_id)
+    cbpi.app.logger.info("LCDDisplay  - CBPi version %s" % version_cache.get(config.version_path).strip())
+
+    # CBPi emits UPDATE_CONFIG when a parameter is saved, reload the snapshot on the next tick
+    if not hook_api("emit", config.invalidate, "UPDATE_CONFIG"):
+        cbpi.app.logger.info("LCDDisplay  - no config change events, parameters reloaded every %ss" % CONFIG_TTL)
+    # started, stopped and finished fermenter steps are reported with UPDATE_FERMENTER
+    hook_api("emit", fermenter_tasks.invalidate, "UPDATE_FERMENTER")
+
+    statistics = set_statistics()
+
+    global lcd_stats
+    if statistics is not None:
+        # one set of statistics for all LCDs, they may share the bus
+        lcd_stats = DriverStats()
+
+    writers = {}  # one writer thread per I2C port
+    for number, settings in enumerate([{"address": LCDaddress}] + set_extra_displays(), 1):
+        name = "LCD%d" % number
+        charmap = settings.get("charmap", characters)
+        port = settings.get("port", 1)
+        cols, rows = settings.get("size", (20, 4))
+        try:
+            display_lcd = lcd(settings["address"], charmap, settings.get("expander", "PCF8574"), port,
+                              settings.get("bank"), cols, rows)
+            define_glyphs(display_lcd, charmap)
+            if lcd_stats is not None:
+                display_lcd.enable_stats(lcd_stats)
+            # from now on only the writer thread of the port talks to the LCD
+            if port not in writers:
+                writers[port] = DisplayWriter(display_lcd, name="lcdwriter-%d" % port, logger=cbpi.app.logger)
+                writers[port].start()
+            displays.append(Display(name, display_lcd, writers[port], charmap, settings.get("mode"),
+                                    settings.get("kettle"), settings.get("sensortype")))
+            cbpi.app.logger.info("LCDDisplay  - %s at %s on port %s" % (name, hex(settings["address"]), port))
+        except Exception as e:
+            cbpi.notify('LCD Address is wrong', 'Change LCD address of %s in parameters, to detect address type in '
+                                                'Raspi comand promt: sudo i2cdetect -y 1' % name,
+                        type='danger', timeout=None)
+            cbpi.app.logger.info("LCDDisplay  - wrong LCD address of %s : %s" % (name, e))
 
     global lcd_unit
     try:
@@ -670,11 +1097,30 @@ def init(cbpi):
         cbpi.app.logger.info("LCDDisplay  - can not get unit : %s" % e)
     pass
 
+    # one scheduler runs the screens of the display modes selected by the lcdjob, a thread per LCD
+    global scheduler
+    scheduler = DisplayScheduler(min_interval=MIN_REDRAW, logger=cbpi.app.logger)
+    scheduler.start()
+
+    # sensor and actor changes wake up the scheduler if redraws are event driven
+    for name in ("receive_sensor_value", "switch_actor_on", "switch_actor_off", "actor_power"):
+        if not hook_api(name, scheduler.notify_update):
+            cbpi.app.logger.info("LCDDisplay  - can not hook %s for event driven redraws" % name)
+
+    if lcd_stats is not None:
+        cbpi.app.logger.info("LCDDisplay  - statistics logged every %s minutes" % statistics)
+
+        @cbpi.backgroundtask(key="lcdstats", interval=statistics * 60)
+        def lcdstats(api):
+            # every summary covers the minutes since the previous one
+            cbpi.app.logger.info("LCDDisplay  - statistics %s" % lcd_stats.summary())
+            lcd_stats.reset()
+
     cbpi.app.logger.info("LCDDisplay  - init passed")
 
     # end of init
 
-    @cbpi.backgroundtask(key="lcdjob", interval=0.7)
+    @cbpi.backgroundtask(key="lcdjob", interval=LCD_TICK)
     def lcdjob(api):
         # YOUR CODE GOES HERE
         # This is the main job
@@ -687,51 +1133,11 @@ def init(cbpi):
             stepname = s.name
         pass
 
-        refresh_time = float(set_parameter_refresh())
-        lcd_mode = str(set_parameter_lcd_display_mode())
-        lcd_sensormode_sensor = set_sensortype_for_sensor_mode()
-        ip = set_ip()
-        character_map = characters
-
-        if stepname is not None and lcd_mode == "Multidisplay":
-            # there is an active step and lcd_mode is multidisplay
-            threadnames = str(threading.enumerate())
-            if "<Thread(multidisplay," in threadnames:
-                if DEBUG: cbpi.app.logger.info("LCDDisplay  - threads Thread multidisplay detected")
-                pass
-            else:
-                t_multidisplay = threading.Thread(target=show_multidisplay, name='multidisplay',
-                                                  args=(refresh_time, character_map))
-                t_multidisplay.start()
-                if DEBUG: cbpi.app.logger.info("LCDDisplay  - threads Thread multidisplay started")
-            pass
-
-        elif stepname is not None and lcd_mode == "Singledisplay":
-            show_singlemode(int(set_parameter_id1()), character_map)
-            pass
+        cfg = config.current()
+        scheduler.event_driven = cfg.event_driven
+        tick = EVENT_TICK if cfg.event_driven else LCD_TICK
 
-        elif stepname is not None and lcd_mode == "Sensordisplay":
-            try:
-                # todo: determine if thread is needed
-                show_sensor_type(lcd_sensormode_sensor, refresh_time, character_map)
-            except Exception as e:
-                cbpi.app.logger.info('LCDDisplay  - Sensordisplay wrong sensortype %s' % e)
-            pass
-
-        elif is_fermenter_step_running() == "active":
-            threadnames = str(threading.enumerate())
-            if "<Thread(fermentation_multidisplay," in threadnames:
-                if DEBUG: cbpi.app.logger.info("LCDDisplay  - threads Thread fermentation_multidisplay detected")
-            else:
-                t_ferm_multidisplay = threading.Thread(target=show_fermentation_multidisplay,
-                                                       name='fermentation_multidisplay',
-                                                       args=(refresh_time, character_map))
-                t_ferm_multidisplay.start()
-                if DEBUG: cbpi.app.logger.info("LCDDisplay  - threads Thread multidisplay started")
-            pass
-
-        else:
-            cbpi_version = (get_version_fo(""))
-            show_standby(ip, cbpi_version, character_map)
-            if DEBUG: cbpi.app.logger.info('LCDDisplay  - show_standby  ip: %s, ver: %s, Charmap: %s' % (ip, cbpi_version, character_map))
+        # the lcdjob only selects the display modes, the scheduler renders them
+        for display in displays:
+            select_mode(display, cfg, stepname, tick)
         pass
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory transport backends for running the LCD drivers off the Pi.
+
+``FakeSMBus`` can be passed as ``bus`` to ``i2c.CharLCD`` and ``FakeGPIO``
+as ``gpio`` to ``gpio.CharLCD``. Both count their transactions and the time
+these would have taken on the real bus. ``FakeSMBus`` also counts the bytes,
+for ``FakeGPIO`` a transaction is a single pin access.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+
+# Bits on the wire per I2C byte: 8 data bits plus ACK
+I2C_BITS_PER_BYTE = 9
+# Start and stop condition of a transfer, roughly one bit time each
+I2C_FRAMING_BITS = 2
+
+
+class FakeSMBus(object):
+
+    def __init__(self, port=1, clock=100000, record=False):
+        """
+        SMBus replacement that keeps everything in memory.
+
+        Args:
+            port:
+                The I2C port number, only kept for reference. Default: ``1``.
+            clock:
+                Simulated bus clock in Hz. Default: ``100000``.
+            record:
+                Whether to keep every transfer in ``log`` as a tuple of kind,
+                address and payload bytes. Default: ``False``.
+
+        """
+        self.port = port
+        self.clock = clock
+        self.record = record
+        self.log = []
+        self.reset()
+
+    def reset(self):
+        """Reset the counters and the log."""
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_time = 0.0
+        del self.log[:]
+
+    def _transfer(self, kind, address, payload):
+        self.transactions += 1
+        self.bytes += len(payload)
+        # Address byte plus payload, with start and stop condition
+        bits = (len(payload) + 1) * I2C_BITS_PER_BYTE + I2C_FRAMING_BITS
+        self.bus_time += bits / self.clock
+        if self.record:
+            self.log.append((kind, address, payload))
+
+    # SMBus API
+
+    def write_byte(self, address, value):
+        self._transfer('byte', address, [value])
+
+    def write_byte_data(self, address, register, value):
+        self._transfer('byte_data', address, [register, value])
+
+    def write_i2c_block_data(self, address, register, values):
+        self._transfer('block', address, [register] + list(values))
+
+    def close(self):
+        pass
+
+    # Raw transfers, used instead of /dev/i2c-N in the ``raw`` transfer mode
+
+    def write_raw(self, address, values):
+        self._transfer('raw', address, list(values))
+
+
+class FakeGPIO(object):
+
+    BOARD = 10
+    BCM = 11
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self, pin_time=1e-6, record=False):
+        """
+        Stand-in for the ``RPi.GPIO`` module. All pins read low, so a polled
+        busy flag is always clear.
+
+        Args:
+            pin_time:
+                Simulated time in seconds of one pin access. Default: ``1e-6``.
+            record:
+                Whether to keep every pin output in ``log`` as a tuple of pin
+                and value. Default: ``False``.
+
+        """
+        self.pin_time = pin_time
+        self.record = record
+        self.mode = None
+        self.pins = {}
+        self.log = []
+        self.reset()
+
+    def reset(self):
+        """Reset the counters and the log."""
+        self.transactions = 0
+        self.bus_time = 0.0
+        del self.log[:]
+
+    # RPi.GPIO API
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction):
+        self.pins.setdefault(pin, 0)
+
+    def output(self, pin, value):
+        self.transactions += 1
+        self.bus_time += self.pin_time
+        self.pins[pin] = 1 if value else 0
+        if self.record:
+            self.log.append((pin, self.pins[pin]))
+
+    def input(self, pin):
+        self.transactions += 1
+        self.bus_time += self.pin_time
+        return 0
+
+    def cleanup(self):
+        self.pins.clear()
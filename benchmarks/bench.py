@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the render pipeline, from encoding to the I2C bus.
+
+Runs the codec, the LCD driver and the screens of the plugin against an
+in-memory SMBus and a mocked ``cbpi`` with 1, 10 and 100 kettles and
+fermenters. Reports the wall time per operation and the bus transactions,
+bytes and simulated bus time per frame.
+
+Usage::
+
+    python benchmarks/bench.py [--transfer-mode block] [--save baseline.json]
+                               [--compare baseline.json] [--filter show_]
+
+The delays of the driver are skipped unless ``--with-delays`` is given, so
+the wall time is the CPU time of the pipeline. Bus time is simulated at
+100 kHz either way.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import argparse
+import datetime
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import types
+from collections import OrderedDict
+from timeit import default_timer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (1, 10, 100)
+
+
+# # # MOCKED CRAFTBEERPI # # #
+
+class Obj(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class MockCbpi(object):
+    """The parts of the CraftBeerPi 3 api used by the plugin."""
+
+    def __init__(self):
+        self.app = Obj(logger=logging.getLogger('bench'))
+        self.cache = {}
+        self.params = {'unit': 'C', 'brewery_name': u'Brauerei Müller'}
+
+    def get_config_parameter(self, key, default):
+        return self.params.get(key, default)
+
+    def add_config_parameter(self, key, value, *args, **kwargs):
+        self.params[key] = value
+
+    def get_sensor_value(self, sensor_id):
+        return 20.0 + int(sensor_id) % 50 + 0.25
+
+    def initalizer(self, order=0):
+        return lambda f: f
+
+    def backgroundtask(self, key, interval):
+        return lambda f: f
+
+    def notify(self, *args, **kwargs):
+        pass
+
+    def emit(self, *args, **kwargs):
+        pass
+
+    def fill(self, count):
+        """Fill the cache with ``count`` kettles, fermenters and sensors."""
+        now = time.time()
+        ids = range(1, count + 1)
+        self.cache.clear()
+        self.cache['kettle'] = dict((i, Obj(id=i, name=u'Kettle %d' % i, sensor=i, heater=i,
+                                            target_temp=65.0)) for i in ids)
+        self.cache['fermenter'] = dict((i, Obj(id=i, name=u'Gärtank %d' % i, brewname=u'Pils %d' % i,
+                                               sensor=i, sensor2=None, heater=i, cooler=count + i,
+                                               target_temp=12.0)) for i in ids)
+        self.cache['fermenter_task'] = dict((i, Obj(id=i, fermenter_id=i, state='A',
+                                                    timer_start=now + 86400 * (i % 14))) for i in ids)
+        self.cache['sensors'] = dict((i, Obj(type='ONE_WIRE_SENSOR', name=u'Sensor %d' % i, config={}))
+                                     for i in ids)
+        self.cache['actors'] = dict((i, Obj(state=i % 2)) for i in range(1, 2 * count + 1))
+        self.cache['active_step'] = Obj(id=1, name='Boil', timer_end=now + 3600,
+                                        hop_1='60', hop_2='30', hop_3='15', hop_4=None, hop_5=None)
+
+
+def load_plugin():
+    """Import the plugin package with the mocked ``modules`` of CraftBeerPi."""
+    cbpi = MockCbpi()
+    sys.modules['modules'] = types.ModuleType(str('modules'))
+    sys.modules['modules'].app = cbpi.app
+    sys.modules['modules'].cbpi = cbpi
+    sys.path.insert(0, os.path.dirname(ROOT))
+    plugin = importlib.import_module(os.path.basename(ROOT))
+    return plugin, cbpi
+
+
+# # # CASES # # #
+
+class Bench(object):
+
+    def __init__(self, plugin, cbpi, transfer_mode):
+        self.plugin = plugin
+        self.cbpi = cbpi
+        self.transfer_mode = transfer_mode
+        i2c = importlib.import_module(plugin.__name__ + '.i2c')
+        backends = importlib.import_module(plugin.__name__ + '.backends')
+        writer = importlib.import_module(plugin.__name__ + '.writer')
+        scheduler = importlib.import_module(plugin.__name__ + '.scheduler')
+
+        self.bus = backends.FakeSMBus()
+        self.lcd = i2c.CharLCD('PCF8574', 0x27, bus=self.bus, charmap='A00', transfer_mode=transfer_mode)
+        plugin.define_glyphs(self.lcd, 'A00')
+
+        # Write frames at once instead of in the writer thread
+        class SyncWriter(writer.DisplayWriter):
+            def submit(self, lines, clear=False, lcd=None):
+                self._write(lcd or self.lcd, writer.Frame(lines=list(lines), clear=clear))
+
+        # Show every page once instead of waiting for the next one
+        class NoWait(object):
+            def wait_update(self, seconds):
+                return scheduler.TIMEOUT
+
+        self.writer = SyncWriter(self.lcd)
+        self.display = plugin.Display('LCD1', self.lcd, self.writer, 'A00')
+
+        # 40x4 LCD with two controllers on the same bus and writer
+        wide = i2c.CharLCD('MCP23017', 0x20, expander_params={'gpio_bank': 'A', 'controllers': 2},
+                           cols=40, rows=4, bus=self.bus, charmap='A00')
+        plugin.define_glyphs(wide, 'A00')
+        self.wide = plugin.Display('LCD2', wide, self.writer, 'A00')
+        plugin.scheduler = NoWait()
+        plugin.lcd_unit = 'C'
+        plugin.config = plugin.ConfigSnapshot()
+
+    def cases(self):
+        codec = self.lcd.codec
+        names = [u'Kettle %d Maische' % i for i in range(100)]
+        frames = ([u'Boil', u'Kettle 1    00:59:59', u'Set|Act:  65° 64.5°C', u'Add Hop in: 00:29:59'],
+                  [u'Mash', u'Kettle 2    00:45:10', u'Targ. Temp: 65.00°C', u'Curr. Temp: 63.75°C'])
+        timers = [u'Kettle 1    00:59:%02d' % i for i in range(60)]
+        state = {'i': 0}
+
+        def encode_cached():
+            for name in names:
+                codec.encode(name)
+
+        def encode_uncached():
+            codec._cache.clear()
+            for name in names:
+                codec.encode(name)
+
+        def write_string():
+            state['i'] += 1
+            self.lcd.home()
+            self.lcd.write_string(u'\r\n'.join(frames[state['i'] % 2]))
+
+        def full_frame():
+            state['i'] += 1
+            self.writer.submit(frames[state['i'] % 2])
+
+        def partial_frame():
+            state['i'] += 1
+            self.writer.submit([frames[0][0], timers[state['i'] % 60]] + frames[0][2:])
+
+        yield 'encode_cached', None, encode_cached
+        yield 'encode_uncached', None, encode_uncached
+        yield 'write_string', None, write_string
+        yield 'full_frame', None, full_frame
+        yield 'partial_frame', None, partial_frame
+
+        p, d, w = self.plugin, self.display, self.wide
+        for size in SIZES:
+            yield 'show_multidisplay', size, lambda: p.show_multidisplay(d, 0, 'A00')
+            yield 'show_multidisplay_40x4', size, lambda: p.show_multidisplay(w, 0, 'A00')
+            yield 'show_singlemode', size, lambda: p.show_singlemode(d, 1, 'A00')
+            yield 'show_sensor_type', size, lambda: p.show_sensor_type(d, 'ONE_WIRE_SENSOR', 0, 'A00')
+            yield 'show_fermentation_multidisplay', size, lambda: p.show_fermentation_multidisplay(d, 0, 'A00')
+            yield 'show_standby_screen', size, lambda: p.show_standby_screen(d, 'A00')
+
+    def run(self, name, size, func, number, repeat):
+        if size is not None:
+            self.cbpi.fill(size)
+            self.plugin.fermenter_tasks.invalidate()
+        func()  # warm up caches, like a running display
+        best = None
+        self.bus.reset()
+        frames = self.writer.frames_written
+        for _ in range(repeat):
+            start = default_timer()
+            for _ in range(number):
+                func()
+            elapsed = (default_timer() - start) / number
+            best = elapsed if best is None else min(best, elapsed)
+        frames = self.writer.frames_written - frames
+        # Cases that bypass the writer report the bus traffic per operation
+        per = frames or number * repeat
+        return {
+            'time': best,
+            'frames': frames / (number * repeat),
+            'transactions': self.bus.transactions / per,
+            'bytes': self.bus.bytes / per,
+            'bus_time': self.bus.bus_time / per,
+        }
+
+
+# # # REPORT # # #
+
+def case_key(name, size):
+    return name if size is None else '%s[%d]' % (name, size)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def delta(value, base):
+    if not base:
+        return ''
+    return '%+.0f%%' % ((value - base) / base * 100)
+
+
+def report(results, baseline=None):
+    base = (baseline or {}).get('results', {})
+    missing = []
+    print('%-36s %12s %7s %8s %8s %10s' % ('case', 'time/op', 'frames', 'trans/fr', 'bytes/fr', 'bus ms/fr'))
+    for key, r in results.items():
+        b = base.get(key, {})
+        print('%-36s %10.1fus %7.1f %8.1f %8.1f %10.2f' % (
+            key, r['time'] * 1e6, r['frames'], r['transactions'], r['bytes'], r['bus_time'] * 1e3))
+        if b:
+            print('%-36s %12s %7s %8s %8s %10s' % (
+                '  vs baseline', delta(r['time'], b.get('time')), '',
+                delta(r['transactions'], b.get('transactions')), delta(r['bytes'], b.get('bytes')),
+                delta(r['bus_time'], b.get('bus_time'))))
+        elif baseline is not None:
+            print('  not in baseline')
+            missing.append(key)
+    if missing:
+        print('%d cases are not in the baseline and can not be compared, store a new one with --save' % len(missing))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the LCD render pipeline.')
+    parser.add_argument('--transfer-mode', default='block', choices=['byte', 'block', 'raw'])
+    parser.add_argument('--number', type=int, default=10, help='operations per measurement')
+    parser.add_argument('--repeat', type=int, default=3, help='measurements per case, the best counts')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    parser.add_argument('--with-delays', action='store_true', help='keep the delays of the driver')
+    parser.add_argument('--save', metavar='FILE', help='store the results as baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a stored baseline')
+    args = parser.parse_args(argv)
+
+    plugin, cbpi = load_plugin()
+    if not args.with_delays:
+        common = importlib.import_module(plugin.__name__ + '.common')
+        common.usleep = common.msleep = lambda t: None
+    bench = Bench(plugin, cbpi, args.transfer_mode)
+
+    results = OrderedDict()
+    for name, size, func in bench.cases():
+        if args.filter in name:
+            results[case_key(name, size)] = bench.run(name, size, func, args.number, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print('Baseline %s of commit %s' % (args.compare, baseline.get('commit')))
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'created': datetime.datetime.now().isoformat(),
+                'transfer_mode': args.transfer_mode,
+                'with_delays': args.with_delays,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+        print('Baseline saved to %s' % args.save)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, division, absolute_import, unicode_literals
 
-from ..common import sliding_window
+import re
+
+from ..common import LRUCache, sliding_window
+from ..compat import unichr, text_type
 from . import hd44780_a00, hd44780_a02
 
 
@@ -18,15 +21,75 @@ class FoundMultiCharMapping(Exception):
     pass
 
 
-class Codec(object):
+class TranslationTable(dict):
+    """
+    Precompiled table for ``unicode.translate`` that maps every character of
+    the encoding table to the character with the code of its LCD byte.
+    Unknown characters are mapped to the replacement character.
+    """
+
     def __init__(self, codec):
+        super(TranslationTable, self).__init__(
+            (ord(char), unichr(value)) for char, value in codec.encoding_table.items()
+        )
+        self.replacement = unichr(codec.replacement_char)
+
+    def __missing__(self, key):
+        return self.replacement
+
+
+class Codec(object):
+    def __init__(self, codec, cache_size=256):
         assert hasattr(codec, 'replacement_char')
         assert hasattr(codec, 'encoding_table')
         assert hasattr(codec, 'combined_chars_lookahead')
         assert hasattr(codec, 'combined_chars')
         self.codec = codec
 
+        # Characters shown with custom glyphs, see ``define_glyph()``
+        self._glyphs = {}
+
+        # Strings without line breaks, combined sequences and glyphs can take
+        # the translation fast path
+        self._compile_special()
+        self._table = TranslationTable(codec)
+
+        # Recently encoded strings. Every codec has its own cache, so entries
+        # are effectively keyed by text and charmap.
+        self._cache = LRUCache(maxsize=cache_size)
+
+    def define_glyph(self, char, code):
+        """
+        Encode ``char`` as ``code``, a glyph code of a ``GlyphManager`` that
+        is replaced with a CGRAM location when the character is written.
+        """
+        self._glyphs[char] = code
+        self._compile_special()
+        self._cache.clear()
+
+    def _compile_special(self):
+        special = ['\r', '\n']
+        for char, mappings in self.codec.combined_chars.items():
+            special.extend(char + mapping[0] for mapping in mappings)
+        special.extend(self._glyphs)
+        self._special = re.compile('|'.join(re.escape(seq) for seq in special))
+
     def encode(self, input_):  # type: (str) -> List[int]
+        cached = self._cache.get(input_)
+        if cached is not None:
+            return list(cached)
+        if isinstance(input_, text_type) and not self._special.search(input_):
+            result = list(bytearray(input_.translate(self._table).encode('latin-1')))
+        else:
+            result = self._encode_slow(input_)
+        self._cache.put(input_, tuple(result))
+        return result
+
+    def cache_info(self):
+        """Return hits, misses and size of the encoding cache."""
+        return self._cache.cache_info()
+
+    def _encode_slow(self, input_):  # type: (str) -> List[int]
         result = []
         window_iter = sliding_window(input_, self.codec.combined_chars_lookahead)
         while True:
@@ -61,6 +124,11 @@ class Codec(object):
             except FoundMultiCharMapping:
                 continue
 
+            # Glyphs take precedence over the encoding table
+            if char in self._glyphs:
+                result.append(self._glyphs[char])
+                continue
+
             # Otherwise, do a regular lookup in the encoding table
             result.append(self.codec.encoding_table.get(char, self.codec.replacement_char))
 
@@ -23,7 +23,11 @@ CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 from __future__ import print_function, division, absolute_import, unicode_literals
 
 import itertools
+import threading
 import time
+from collections import OrderedDict, namedtuple
+
+from .compat import range, perf_counter_ns
 
 
 # # # BIT PATTERNS # # #
@@ -75,6 +79,24 @@ RS_INSTRUCTION = 0x00
 RS_DATA = 0x01
 
 
+# # # TIMING # # #
+
+# Minimum timing of the HD44780 in microseconds (datasheet, fosc = 270 kHz, VCC = 5V)
+EXEC_US = 37  # Most instructions
+DATA_EXEC_US = 41  # Data writes, including the address counter update
+CLEAR_EXEC_US = 1520  # Clear display and return home
+E_PULSE_US = 0.45  # Enable pulse width (PW_EH)
+E_CYCLE_US = 1.0  # Enable cycle time (t_cycE)
+POWER_ON_US = 50000  # After VCC rises above 2.7V, the datasheet asks for 40ms
+INIT_WAIT_US = 4100  # After the first function set of the init sequence
+INIT_WAIT2_US = 100  # After the second function set of the init sequence
+
+# Waits up to this many microseconds are spun on the clock, longer ones sleep
+# and spin for the rest. Set by calibrate_delay() or set_spin_threshold().
+_spin_threshold = 100.0
+_calibrated = False
+
+
 # # # Helper classes # # #
 
 class Alignment(object):
@@ -93,16 +115,106 @@ class CursorMode(object):
     blink = LCD_CURSOROFF | LCD_BLINKON
 
 
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class LRUCache(object):
+    """
+    Thread safe mapping with a bounded size that evicts the least recently
+    used entry and counts hits and misses.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for ``key`` and mark it as recently used."""
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store ``value`` for ``key``, evicting the oldest entry if full."""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
 # # # HELPER FUNCTIONS # # #
 
 def msleep(milliseconds):
     """Sleep the specified amount of milliseconds."""
-    time.sleep(milliseconds / 1000.0)
+    delay(milliseconds * 1000.0)
 
 
 def usleep(microseconds):
     """Sleep the specified amount of microseconds."""
-    time.sleep(microseconds / 1000000.0)
+    delay(microseconds)
+
+
+def delay(microseconds):
+    """
+    Wait at least the specified amount of microseconds.
+
+    ``time.sleep()`` often takes 60-100us longer than asked, which is more
+    than most waits of the display. Waits up to the spin threshold therefore
+    busy wait on the clock. Longer waits sleep until the threshold is left
+    and busy wait for the rest, so they end on time as well.
+    """
+    deadline = perf_counter_ns() + int(microseconds * 1000)
+    if microseconds > _spin_threshold:
+        time.sleep((microseconds - _spin_threshold) / 1000000.0)
+    while perf_counter_ns() < deadline:
+        pass
+
+
+def set_spin_threshold(microseconds):
+    """Spin on waits up to the specified amount of microseconds, sleep on
+    longer ones. This also turns off the calibration of ``delay()``."""
+    global _spin_threshold, _calibrated
+    _spin_threshold = float(microseconds)
+    _calibrated = True
+
+
+def calibrate_delay(samples=20, force=False):
+    """
+    Set the spin threshold of ``delay()`` to how much longer than asked
+    ``time.sleep()`` takes on this system, rarely exceeded. Only measures
+    once, unless ``force`` is set. Returns the threshold in microseconds.
+    """
+    global _spin_threshold, _calibrated
+    if _calibrated and not force:
+        return _spin_threshold
+    overshoots = []
+    for _ in range(samples):
+        start = perf_counter_ns()
+        time.sleep(INIT_WAIT2_US / 1000000.0)
+        overshoots.append((perf_counter_ns() - start) / 1000.0 - INIT_WAIT2_US)
+    overshoots.sort()
+    _spin_threshold = max(overshoots[int(len(overshoots) * 0.9)], 0.0)
+    _calibrated = True
+    return _spin_threshold
 
 
 def sliding_window(seq, lookahead):
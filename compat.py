@@ -29,3 +29,24 @@ try:
     range = xrange
 except NameError:
     range = range
+
+try:
+    unichr = unichr
+except NameError:
+    unichr = chr
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+try:
+    from time import perf_counter_ns
+except ImportError:  # Python < 3.7
+    try:
+        from time import perf_counter
+    except ImportError:  # Python 2
+        from time import time as perf_counter
+
+    def perf_counter_ns():
+        return int(perf_counter() * 1e9)
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+HD44780 controller emulator for verifying the drivers off the Pi.
+
+``HD44780`` follows the E, RS, RW and data lines like the controller does
+and keeps DDRAM, CGRAM, the address counter and the entry mode. Writes that
+arrive while the controller is still busy or enable pulses that are too
+short are flagged as timing violations.
+
+``EmulatedSMBus`` and ``EmulatedGPIO`` are transport backends that feed the
+waveforms of ``i2c.CharLCD`` and ``gpio.CharLCD`` into an emulated display,
+or into two controllers for displays with a second enable line.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import time
+from collections import namedtuple
+
+from . import common as c
+from .backends import FakeSMBus, FakeGPIO, I2C_BITS_PER_BYTE
+
+
+Violation = namedtuple('Violation', 'time kind detail')
+
+# Timing of the HD44780 in seconds, see common.py
+EXEC_TIME = c.EXEC_US / 1e6
+DATA_EXEC_TIME = c.DATA_EXEC_US / 1e6
+CLEAR_EXEC_TIME = c.CLEAR_EXEC_US / 1e6
+E_PULSE_MIN = c.E_PULSE_US / 1e6
+E_CYCLE_MIN = c.E_CYCLE_US / 1e6
+
+# Length of a display line in DDRAM
+LINE_LENGTH = 40
+
+# MCP230XX registers that drive the display, see i2c.py
+MCP230XX_GPIO_REGISTERS = (0x09, 0x12, 0x13)
+
+
+class HD44780(object):
+
+    def __init__(self, rows=4, cols=20, strict=False):
+        """
+        Emulated HD44780 controller. It starts in 8 bit mode like after power
+        on, so it expects the initialization sequence of the drivers.
+
+        Args:
+            rows:
+                Number of display rows. Default: ``4``.
+            cols:
+                Number of columns per row. Default: ``20``.
+            strict:
+                Whether to ignore writes that arrive while the controller is
+                busy, like a real controller may do. Otherwise they are only
+                flagged. Default: ``False``.
+
+        """
+        self.rows = rows
+        self.cols = cols
+        self.strict = strict
+        self.ddram = [0x20] * 0x80
+        self.cgram = [0x00] * 0x40
+        self.ac = 0
+        self.cgram_selected = False
+        self.increment = True
+        self.shift_display = False
+        self.shift = 0
+        self.display_on = False
+        self.cursor = False
+        self.blink = False
+        self.eight_bit = True
+        self.two_lines = False
+        self.busy_until = 0
+        self.instructions = 0
+        self.writes = 0
+        self.violations = []
+        self.min_slack = None  # Smallest time between ready and the next write
+        self._e = 0
+        self._e_rise = None
+        self._nibble = None
+        self._read_nibble = 0
+        self._read_value = 0
+
+    # Bus lines
+
+    def update(self, now, rs, rw, e, data):
+        """
+        Take the state of the lines at time ``now``. ``data`` is the byte on
+        D7-D0. In 4 bit mode only D7-D4 are used. The controller acts on the
+        edges of ``e``.
+        """
+        e = 1 if e else 0
+        if e and not self._e:
+            if self._e_rise is not None and now - self._e_rise < E_CYCLE_MIN:
+                self._flag(now, 'cycle', 'enable cycle of %.0fns' % ((now - self._e_rise) * 1e9))
+            self._e_rise = now
+            if rw:
+                self._present(now, rs)
+        elif self._e and not e:
+            if self._e_rise is not None and now - self._e_rise < E_PULSE_MIN:
+                self._flag(now, 'pulse', 'enable pulse of %.0fns' % ((now - self._e_rise) * 1e9))
+            if rw:
+                if not self.eight_bit:
+                    self._read_nibble ^= 1
+            else:
+                self._latch(now, rs, data)
+        self._e = e
+
+    def read(self):
+        """Return the byte the controller currently drives on D7-D0."""
+        if self.eight_bit:
+            return self._read_value
+        if self._read_nibble:
+            return (self._read_value << 4) & 0xF0
+        return self._read_value & 0xF0
+
+    # Display content
+
+    def row_addresses(self, row):
+        """Return the DDRAM addresses shown in a row, display shift included."""
+        line = 0x40 if row % 2 else 0x00
+        start = self.cols if row >= 2 else 0
+        return [line + (start + col + self.shift) % LINE_LENGTH for col in range(self.cols)]
+
+    def content(self):
+        """Return the displayed characters as rows of raw bytes."""
+        return [[self.ddram[a] for a in self.row_addresses(row)] for row in range(self.rows)]
+
+    def glyph(self, location):
+        """Return the bitmap of a CGRAM location as a tuple of 8 rows."""
+        return tuple(self.cgram[location * 8:location * 8 + 8])
+
+    # Internals
+
+    def _flag(self, now, kind, detail):
+        self.violations.append(Violation(now, kind, detail))
+
+    def _latch(self, now, rs, data):
+        if self.eight_bit:
+            self._execute(now, rs, data & 0xFF, self._check_ready(now))
+        elif self._nibble is None:
+            # The controller has to be ready for the first nibble of a byte
+            self._nibble = (data & 0xF0, self._check_ready(now))
+        else:
+            high, ready = self._nibble
+            self._nibble = None
+            self._execute(now, rs, high | ((data >> 4) & 0x0F), ready)
+
+    def _check_ready(self, now):
+        slack = now - self.busy_until
+        if self.min_slack is None or slack < self.min_slack:
+            self.min_slack = slack
+        if slack < 0:
+            self._flag(now, 'busy', 'write %.1fus before the controller was ready' % (-slack * 1e6))
+            return False
+        return True
+
+    def _execute(self, now, rs, value, ready):
+        if self.strict and not ready:
+            return
+        if rs:
+            self._write_data(value)
+            self.busy_until = now + DATA_EXEC_TIME
+        else:
+            self.busy_until = now + self._instruction(value)
+
+    def _write_data(self, value):
+        self.writes += 1
+        if self.cgram_selected:
+            self.cgram[self.ac & 0x3F] = value & 0x1F
+        else:
+            self.ddram[self.ac & 0x7F] = value
+        self._advance(1 if self.increment else -1)
+        if self.shift_display and not self.cgram_selected:
+            self.shift = (self.shift + (1 if self.increment else -1)) % LINE_LENGTH
+
+    def _advance(self, step):
+        if self.cgram_selected:
+            self.ac = (self.ac + step) & 0x3F
+        elif self.two_lines:
+            line, col = self.ac & 0x40, (self.ac & 0x3F) + step
+            if col >= LINE_LENGTH:
+                line, col = line ^ 0x40, 0
+            elif col < 0:
+                line, col = line ^ 0x40, LINE_LENGTH - 1
+            self.ac = line | col
+        else:
+            self.ac = (self.ac + step) % (LINE_LENGTH * 2)
+
+    def _instruction(self, value):
+        self.instructions += 1
+        if value & c.LCD_SETDDRAMADDR:
+            self.ac = value & 0x7F
+            self.cgram_selected = False
+        elif value & c.LCD_SETCGRAMADDR:
+            self.ac = value & 0x3F
+            self.cgram_selected = True
+        elif value & c.LCD_FUNCTIONSET:
+            self.eight_bit = bool(value & c.LCD_8BITMODE)
+            self.two_lines = bool(value & c.LCD_2LINE)
+            self._nibble = None
+        elif value & c.LCD_CURSORSHIFT:
+            step = 1 if value & c.LCD_MOVERIGHT else -1
+            if value & c.LCD_DISPLAYMOVE:
+                self.shift = (self.shift - step) % LINE_LENGTH
+            else:
+                self._advance(step)
+        elif value & c.LCD_DISPLAYCONTROL:
+            self.display_on = bool(value & c.LCD_DISPLAYON)
+            self.cursor = bool(value & 0x02)
+            self.blink = bool(value & 0x01)
+        elif value & c.LCD_ENTRYMODESET:
+            self.increment = bool(value & 0x02)
+            self.shift_display = bool(value & 0x01)
+        elif value & c.LCD_RETURNHOME:
+            self.ac = 0
+            self.cgram_selected = False
+            self.shift = 0
+            return CLEAR_EXEC_TIME
+        elif value & c.LCD_CLEARDISPLAY:
+            self.ddram = [0x20] * 0x80
+            self.ac = 0
+            self.cgram_selected = False
+            self.shift = 0
+            self.increment = True
+            return CLEAR_EXEC_TIME
+        return EXEC_TIME
+
+    def _present(self, now, rs):
+        if self._read_nibble:
+            return  # Second nibble of the same byte
+        if rs:
+            self._read_value = self.cgram[self.ac & 0x3F] if self.cgram_selected else self.ddram[self.ac & 0x7F]
+            self._advance(1 if self.increment else -1)
+        else:
+            busy = 0x80 if now < self.busy_until else 0
+            self._read_value = busy | (self.ac & 0x7F)
+
+
+class EmulatedSMBus(FakeSMBus):
+
+    def __init__(self, rows=4, cols=20, expander='PCF8574', strict=False, timer=time.time, controllers=1,
+                 **kwargs):
+        """
+        ``FakeSMBus`` whose port expander drives an emulated ``HD44780``,
+        available as ``display``. With two controllers both are in
+        ``displays``, the second one is enabled by pin 0 of a MCP230XX.
+
+        The expander output changes with the acknowledge of every byte, so
+        the states of one transfer are spaced by the byte time of the bus
+        clock. A real SMBus call blocks until the transfer is done, this one
+        returns at once. So the emulated time only advances by the bus time
+        of the transfers plus the time that passes between two calls, e.g.
+        the delays of the driver.
+
+        Args:
+            rows:
+                Number of display rows. Default: ``4``.
+            cols:
+                Number of columns per row. Default: ``20``.
+            expander:
+                ``PCF8574`` or ``MCP23008`` / ``MCP23017``. Default: ``PCF8574``.
+            strict:
+                Passed on to ``HD44780``. Default: ``False``.
+            timer:
+                Clock in seconds. Default: ``time.time``.
+            controllers:
+                ``1`` or ``2`` controllers, which share the rows. Default: ``1``.
+
+        Other keyword arguments are passed on to ``FakeSMBus``.
+
+        """
+        super(EmulatedSMBus, self).__init__(**kwargs)
+        self.displays = [HD44780(rows // controllers, cols, strict=strict) for _ in range(controllers)]
+        self.display = self.displays[0]
+        self.expander = expander
+        self._timer = timer
+        self._now = None  # Emulated time at the end of the last transfer
+        self._returned = None  # Real time when the last transfer returned
+
+    def _transfer(self, kind, address, payload):
+        super(EmulatedSMBus, self)._transfer(kind, address, payload)
+        byte_time = I2C_BITS_PER_BYTE / self.clock
+        real = self._timer()
+        start = real if self._now is None else self._now + max(real - self._returned, 0)
+        if self.expander == 'PCF8574':
+            # Every byte is a new port state
+            states = list(enumerate(payload))
+        elif kind == 'byte_data' and payload[0] in MCP230XX_GPIO_REGISTERS:
+            states = [(1, payload[1])]
+        else:
+            states = []
+        for i, state in states:
+            # The address byte comes first
+            now = start + (i + 1) * byte_time
+            if self.expander == 'PCF8574':
+                self.display.update(now, state & 0x01, state & 0x02, state & 0x04, state & 0xF0)
+            else:
+                for display, e in zip(self.displays, (0x04, 0x01)):
+                    display.update(now, state & 0x02, 0, state & e, (state << 1) & 0xF0)
+        self._now = start + (len(payload) + 1) * byte_time
+        self._returned = real
+
+
+class EmulatedGPIO(FakeGPIO):
+
+    def __init__(self, pin_rs, pin_e, pins_data, pin_rw=None, rows=4, cols=20, strict=False,
+                 timer=time.time, pin_e2=None, **kwargs):
+        """
+        ``FakeGPIO`` whose pins drive an emulated ``HD44780``, available as
+        ``display``. Reading the data pins returns what the controller
+        drives, so the busy flag can be polled. With ``pin_e2`` a second
+        controller drives the lower half of the rows, both are in
+        ``displays``.
+
+        Args:
+            pin_rs, pin_e, pins_data, pin_rw, pin_e2:
+                The pins as passed to ``gpio.CharLCD``.
+            rows:
+                Number of display rows. Default: ``4``.
+            cols:
+                Number of columns per row. Default: ``20``.
+            strict:
+                Passed on to ``HD44780``. Default: ``False``.
+            timer:
+                Clock in seconds. Default: ``time.time``.
+
+        Other keyword arguments are passed on to ``FakeGPIO``.
+
+        """
+        super(EmulatedGPIO, self).__init__(**kwargs)
+        self._enables = (pin_e,) if pin_e2 is None else (pin_e, pin_e2)
+        self.displays = [HD44780(rows // len(self._enables), cols, strict=strict) for _ in self._enables]
+        self.display = self.displays[0]
+        self._rs = pin_rs
+        self._rw = pin_rw
+        # Bit of the data bus of every data pin, 4 pins are D4-D7
+        first = 8 - len(pins_data)
+        self._data = dict((pin, first + i) for i, pin in enumerate(pins_data))
+        self._timer = timer
+
+    def output(self, pin, value):
+        super(EmulatedGPIO, self).output(pin, value)
+        if pin in self._enables or pin == self._rs or pin == self._rw or pin in self._data:
+            data = 0
+            for data_pin, bit in self._data.items():
+                data |= self.pins.get(data_pin, 0) << bit
+            rw = self.pins.get(self._rw, 0) if self._rw is not None else 0
+            for display, pin_e in zip(self.displays, self._enables):
+                display.update(self._timer(), self.pins.get(self._rs, 0), rw,
+                               self.pins.get(pin_e, 0), data)
+
+    def input(self, pin):
+        super(EmulatedGPIO, self).input(pin)
+        if pin in self._data:
+            return (self.display.read() >> self._data[pin]) & 0x01
+        return self.pins.get(pin, 0)
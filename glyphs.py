@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from collections import OrderedDict
+
+
+# Glyph codes start above the byte range, so they never clash with
+# characters of the LCD.
+GLYPH_BASE = 0x100
+
+
+class GlyphManager(object):
+
+    def __init__(self, lcd, slots=8):
+        """
+        Custom characters of a character LCD, loaded into CGRAM on demand.
+
+        Glyphs are defined once for a unicode character. The codec of the LCD
+        encodes that character as a glyph code, which is replaced with a
+        CGRAM location when it is written to the display. Glyphs get a
+        location when they are needed. If all locations are taken, the least
+        recently used glyph that is not part of the same frame is evicted. A
+        bitmap that is already loaded is never uploaded again.
+
+        Args:
+            lcd:
+                The ``CharLCD`` instance.
+            slots:
+                Number of CGRAM locations to manage. Default: ``8``.
+
+        """
+        self.lcd = lcd
+        self.bitmaps = []  # Bitmap of every glyph code, by code - GLYPH_BASE
+        self.uploads = 0
+        self._free = list(range(slots))
+        self._loaded = OrderedDict()  # Location -> bitmap, least recently used first
+
+    def define(self, char, bitmap):
+        """
+        Show ``char`` with the specified bitmap and return its glyph code.
+
+        Args:
+            char:
+                The unicode character, e.g. ``Ä`` or a character of the
+                private use area like ``\\ue000`` for symbols.
+            bitmap:
+                Tuple of 8 numbers, each representing a 5 pixel row.
+
+        """
+        assert len(char) == 1, 'Glyphs are defined for single characters.'
+        assert len(bitmap) == 8, 'Bitmap should have exactly 8 rows.'
+        code = GLYPH_BASE + len(self.bitmaps)
+        self.bitmaps.append(tuple(bitmap))
+        self.lcd.codec.define_glyph(char, code)
+        return code
+
+    def reserve(self, location):
+        """Stop managing a location, e.g. after ``create_char()`` wrote to it."""
+        if location in self._free:
+            self._free.remove(location)
+        self._loaded.pop(location, None)
+
+    def resolve(self, rows, pinned=()):
+        """
+        Replace the glyph codes in ``rows`` with CGRAM locations, in place.
+
+        Glyphs of the same rows, locations that the rows already show and
+        locations in ``pinned`` are never evicted to make room. Glyphs that
+        don't fit are replaced with the replacement character of the codec.
+        """
+        pinned = set(pinned)
+        # Cells resolved by an earlier call hold locations, keep them loaded
+        for row in rows:
+            pinned.update(value for value in row if value < 8)
+        locations = {}
+        for row in rows:
+            for i, value in enumerate(row):
+                if value < GLYPH_BASE:
+                    continue
+                if value not in locations:
+                    locations[value] = self.location(value, pinned)
+                    pinned.add(locations[value])
+                row[i] = locations[value]
+
+    def location(self, code, pinned=()):
+        """
+        Return the CGRAM location of a glyph code, loading the glyph if
+        necessary. Returns the replacement character of the codec if all
+        locations are pinned.
+        """
+        bitmap = self.bitmaps[code - GLYPH_BASE]
+        for location, loaded in self._loaded.items():
+            if loaded == bitmap:
+                # Mark as most recently used
+                del self._loaded[location]
+                self._loaded[location] = bitmap
+                return location
+        if self._free:
+            location = self._free.pop(0)
+        else:
+            location = next((l for l in self._loaded if l not in pinned), None)
+            if location is None:
+                return self.lcd.codec.codec.replacement_char
+            del self._loaded[location]
+        self.lcd._load_char(location, bitmap)
+        self._loaded[location] = bitmap
+        self.uploads += 1
+        return location
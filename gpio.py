@@ -22,16 +22,24 @@ CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 from __future__ import print_function, division, absolute_import, unicode_literals
 
+import time
 from collections import namedtuple
 
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:  # Not on a Pi, a GPIO backend has to be passed in
+    GPIO = None
 
 from . import common as c
 from .lcd import BaseCharLCD
+from .stats import InstrumentedBackend
 from .compat import range
 
 
-PinConfig = namedtuple('PinConfig', 'rs rw e d0 d1 d2 d3 d4 d5 d6 d7 backlight mode')
+PinConfig = namedtuple('PinConfig', 'rs rw e d0 d1 d2 d3 d4 d5 d6 d7 e2 backlight mode')
+
+# Give up polling the busy flag after this many seconds (clear takes 1.52ms)
+BUSY_FLAG_TIMEOUT = 0.01
 
 
 class CharLCD(BaseCharLCD):
@@ -40,7 +48,10 @@ class CharLCD(BaseCharLCD):
                        backlight_enabled=True,
                        cols=20, rows=4, dotsize=8,
                        charmap='A02',
-                       auto_linebreaks=True):
+                       auto_linebreaks=True,
+                       poll_busy_flag=False,
+                       gpio=None,
+                       pin_e2=None):
         """
         Character LCD controller.
 
@@ -85,10 +96,34 @@ class CharLCD(BaseCharLCD):
         :param auto_linebreaks: Whether or not to automatically insert line
             breaks. Default: ``True``.
         :type auto_linebreaks: bool
+        :param poll_busy_flag: Whether to read the busy flag (DB7) after every
+            byte and continue as soon as the controller is ready, instead of
+            waiting the fixed worst case delays. Requires ``pin_rw``, without
+            it the fixed delays are used. If the busy flag never clears, the
+            fixed delays are used from then on. Warning: while reading, the
+            display drives the data pins, so only enable this if the display
+            runs at 3.3V or the data lines are level shifted. Default: ``False``.
+        :type poll_busy_flag: bool
+        :param gpio: Object with the ``RPi.GPIO`` API to use instead of that
+            module, e.g. a ``backends.FakeGPIO``. Default: ``None``.
+        :type gpio: object
+        :param pin_e2: Enable pin of the second controller of displays with
+            two controllers, like 40x4 displays. The upper half of the rows
+            is driven with ``pin_e``, the lower half with ``pin_e2``. The busy
+            flag is not polled on these displays. Default: ``None``.
+        :type pin_e2: int
 
         """
+        # Set GPIO backend
+        if gpio is not None:
+            self._gpio = gpio
+        elif GPIO is None:
+            raise ImportError('RPi.GPIO is required unless a GPIO backend is passed in.')
+        else:
+            self._gpio = GPIO
+
         # Set attributes
-        if numbering_mode == GPIO.BCM or numbering_mode == GPIO.BOARD:
+        if numbering_mode == self._gpio.BCM or numbering_mode == self._gpio.BOARD:
             self.numbering_mode = numbering_mode
         else:
             raise ValueError('Invalid GPIO numbering mode: numbering_mode=%s, '
@@ -110,36 +145,53 @@ class CharLCD(BaseCharLCD):
         self.pins = PinConfig(rs=pin_rs, rw=pin_rw, e=pin_e,
                               d0=block1[0], d1=block1[1], d2=block1[2], d3=block1[3],
                               d4=block2[0], d5=block2[1], d6=block2[2], d7=block2[3],
+                              e2=pin_e2,
                               backlight=pin_backlight,
                               mode=numbering_mode)
         self.backlight_mode = backlight_mode
 
+        # Enable pins of the selected controllers, None selects all of them
+        if pin_e2 is None:
+            controllers = 1
+            self._enable_pins = {None: (pin_e,), 0: (pin_e,)}
+        else:
+            controllers = 2
+            self._enable_pins = {None: (pin_e, pin_e2), 0: (pin_e,), 1: (pin_e2,)}
+
+        # The busy flag can't be read before the initialization is done
+        self._poll_busy_flag = False
+
         # Call superclass
         super(CharLCD, self).__init__(cols, rows, dotsize,
                                       charmap=charmap,
-                                      auto_linebreaks=auto_linebreaks)
+                                      auto_linebreaks=auto_linebreaks,
+                                      controllers=controllers)
 
         # Set backlight status
         if pin_backlight is not None:
             self.backlight_enabled = backlight_enabled
 
+        # Reading the busy flag requires the RW pin and a single controller
+        self._poll_busy_flag = poll_busy_flag and pin_rw is not None and pin_e2 is None
+
     def _init_connection(self):
         # Setup GPIO
-        GPIO.setmode(self.numbering_mode)
+        self._gpio.setmode(self.numbering_mode)
         for pin in list(filter(None, self.pins))[:-1]:
-            GPIO.setup(pin, GPIO.OUT)
+            self._gpio.setup(pin, self._gpio.OUT)
         if self.pins.backlight is not None:
-            GPIO.setup(self.pins.backlight, GPIO.OUT)
+            self._gpio.setup(self.pins.backlight, self._gpio.OUT)
 
         # Initialization
-        c.msleep(50)
-        GPIO.output(self.pins.rs, 0)
-        GPIO.output(self.pins.e, 0)
+        self._sleep(c.POWER_ON_US)
+        self._gpio.output(self.pins.rs, 0)
+        for pin in self._enable_pins[None]:
+            self._gpio.output(pin, 0)
         if self.pins.rw is not None:
-            GPIO.output(self.pins.rw, 0)
+            self._gpio.output(self.pins.rw, 0)
 
     def _close_connection(self):
-        GPIO.cleanup()
+        self._gpio.cleanup()
 
     # Properties
 
@@ -156,24 +208,29 @@ class CharLCD(BaseCharLCD):
         if not isinstance(value, bool):
             raise ValueError('backlight_enabled must be set to ``True`` or ``False``.')
         self._backlight_enabled = value
-        GPIO.output(self.pins.backlight,
+        self._gpio.output(self.pins.backlight,
                     value ^ (self.backlight_mode == 'active_low'))
 
     backlight_enabled = property(_get_backlight_enabled, _set_backlight_enabled,
             doc='Whether or not to turn on the backlight.')
 
+    def _instrument(self, stats):
+        self._gpio = InstrumentedBackend(self._gpio, stats)
+
     # Low level commands
 
     def _send(self, value, mode):
         """Send the specified value to the display with automatic 4bit / 8bit
         selection. The rs_mode is either ``RS_DATA`` or ``RS_INSTRUCTION``."""
+        if self.stats is not None:
+            self.stats.count('data_bytes' if mode == c.RS_DATA else 'commands')
 
         # Choose instruction or data mode
-        GPIO.output(self.pins.rs, mode)
+        self._gpio.output(self.pins.rs, mode)
 
         # If the RW pin is used, set it to low in order to write.
         if self.pins.rw is not None:
-            GPIO.output(self.pins.rw, 0)
+            self._gpio.output(self.pins.rw, 0)
 
         # Write data out in chunks of 4 or 8 bit
         if self.data_bus_mode == c.LCD_8BITMODE:
@@ -182,6 +239,9 @@ class CharLCD(BaseCharLCD):
             self._write4bits(value >> 4)
             self._write4bits(value)
 
+        if self._poll_busy_flag:
+            self._wait_busy_flag()
+
     def _send_data(self, value):
         """Send data to the display. """
         self._send(value, c.RS_DATA)
@@ -194,21 +254,72 @@ class CharLCD(BaseCharLCD):
         """Write 4 bits of data into the data bus."""
         for i in range(4):
             bit = (value >> i) & 0x01
-            GPIO.output(self.pins[i + 7], bit)
+            self._gpio.output(self.pins[i + 7], bit)
         self._pulse_enable()
 
     def _write8bits(self, value):
         """Write 8 bits of data into the data bus."""
         for i in range(8):
             bit = (value >> i) & 0x01
-            GPIO.output(self.pins[i + 3], bit)
+            self._gpio.output(self.pins[i + 3], bit)
         self._pulse_enable()
 
     def _pulse_enable(self):
-        """Pulse the `enable` flag to process data."""
-        GPIO.output(self.pins.e, 0)
-        c.usleep(1)
-        GPIO.output(self.pins.e, 1)
-        c.usleep(1)
-        GPIO.output(self.pins.e, 0)
-        c.usleep(100)  # commands need > 37us to settle
+        """Pulse the `enable` flag of the selected controllers to process data."""
+        pins = self._enable_pins[self._controller]
+        if self.controllers > 1:
+            self._wait_controller()
+        for pin in pins:
+            self._gpio.output(pin, 0)
+        self._sleep(1)
+        for pin in pins:
+            self._gpio.output(pin, 1)
+        self._sleep(1)
+        for pin in pins:
+            self._gpio.output(pin, 0)
+        if self.controllers > 1:
+            # Meanwhile the other controller can be written
+            self._mark_busy(100)
+        elif not self._poll_busy_flag:
+            self._sleep(100)  # commands need > 37us to settle
+
+    def _wait_ready(self, microseconds):
+        # When polling, _send already waited for the busy flag to clear.
+        if not self._poll_busy_flag:
+            super(CharLCD, self)._wait_ready(microseconds)
+
+    def _wait_busy_flag(self):
+        """Read the busy flag until the controller is ready for the next
+        instruction. Falls back to the fixed delays if it never clears."""
+        data_pins = [pin for pin in self.pins[3:11] if pin is not None]
+        for pin in data_pins:
+            self._gpio.setup(pin, self._gpio.IN)
+        self._gpio.output(self.pins.rs, c.RS_INSTRUCTION)
+        self._gpio.output(self.pins.rw, 1)
+        deadline = time.time() + BUSY_FLAG_TIMEOUT
+        try:
+            while True:
+                # Decided before the read, so the flag is read once more after a stall
+                timed_out = time.time() > deadline
+                self._gpio.output(self.pins.e, 1)
+                self._sleep(1)
+                busy = self._gpio.input(self.pins.d7)
+                self._gpio.output(self.pins.e, 0)
+                if self.data_bus_mode == c.LCD_4BITMODE:
+                    # Clock out the lower nibble (address counter) as well
+                    self._sleep(1)
+                    self._gpio.output(self.pins.e, 1)
+                    self._sleep(1)
+                    self._gpio.output(self.pins.e, 0)
+                if not busy:
+                    break
+                if timed_out:
+                    # RW is probably not wired, use the fixed delays from now on
+                    self._poll_busy_flag = False
+                    self._sleep(2000)
+                    break
+                self._sleep(1)
+        finally:
+            self._gpio.output(self.pins.rw, 0)
+            for pin in data_pins:
+                self._gpio.setup(pin, self._gpio.OUT)
@@ -22,10 +22,19 @@ CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 from __future__ import print_function, division, absolute_import, unicode_literals
 
-from smbus import SMBus
+import fcntl
+import os
+from timeit import default_timer
+
+try:
+    from smbus import SMBus
+except ImportError:  # Not on a Pi, a bus backend has to be passed in
+    SMBus = None
 
 from . import common as c
 from .lcd import BaseCharLCD
+from .stats import InstrumentedBackend
+from .compat import range
 
 # PCF8574 backlight control
 PCF8574_BACKLIGHT = 0x08
@@ -43,6 +52,7 @@ MCP230XX_NOBACKLIGHT = 0x7f
 # MCP230XX pin bitmasks and datamask
 MCP230XX_RS = 0x02
 MCP230XX_E = 0x4
+MCP230XX_E2 = 0x01  # Enable of the second controller, unused on single controller displays
 MCP230XX_DATAMASK = 0x78
 MCP230XX_DATASHIFT = 3
 
@@ -56,13 +66,22 @@ MCP23017_IODIRB = 0x01
 MCP23017_GPIOA = 0x12
 MCP23017_GPIOB = 0x13
 
+# SMBus block writes carry a command byte plus up to 32 data bytes
+I2C_BLOCK_MAX = 32
+
+# Raw /dev/i2c-N writes, the kernel refuses messages longer than 8192 bytes
+I2C_SLAVE = 0x0703
+I2C_RAW_MAX = 4096
+
 
 class CharLCD(BaseCharLCD):
     def __init__(self, i2c_expander, address, expander_params=None, port=1,
                        cols=20, rows=4, dotsize=8,
                        charmap='A02',
                        auto_linebreaks=True,
-                       backlight_enabled=True):
+                       backlight_enabled=True,
+                       transfer_mode='byte',
+                       bus=None):
         """
         CharLCD via PCF8574 I2C port expander:
 
@@ -94,6 +113,10 @@ class CharLCD(BaseCharLCD):
             7  | 6  | 5  | 4  | 3  | 2 | 1  | 0
             BL | D7 | D6 | D5 | D4 | E | RS | -
 
+            Displays with two controllers, like 40x4 displays, are supported
+            with the MCP23017. The enable line of the second controller, which
+            drives the lower half of the rows, goes to pin 0.
+
 
         :param address: The I2C address of your LCD.
         :type address: int
@@ -102,7 +125,8 @@ class CharLCD(BaseCharLCD):
         :param expander_params: Parameters for expanders, in a dictionary. Only needed for MCP23017
             gpio_bank - This must be either ``A`` or ``B``
                          If you have a HAT, A is usually marked 1 and B is 2
-            Example: expander_params={'gpio_bank': 'A'}
+            controllers - Number of controllers of the display, ``1`` or ``2``. Default: ``1``.
+            Example: expander_params={'gpio_bank': 'A', 'controllers': 2}
         :type expander_params: dictionary
         :param port: The I2C port number. Default: ``1``.
         :type port: int
@@ -121,11 +145,24 @@ class CharLCD(BaseCharLCD):
         :type auto_linebreaks: bool
         :param backlight_enabled: Whether the backlight is enabled initially. Default: ``True``.
         :type backlight_enabled: bool
+        :param transfer_mode: How port states are pushed to the expander. ``byte``
+            writes every state with its own SMBus call. ``block`` builds the whole
+            enable waveform of a byte, string or framebuffer run into one buffer
+            and sends it with SMBus block writes, ``raw`` writes that buffer to
+            ``/dev/i2c-N`` directly. Batching is only supported with the PCF8574.
+            Default: ``byte``.
+        :type transfer_mode: str
+        :param bus: SMBus compatible object to use instead of ``smbus.SMBus(port)``,
+            e.g. a ``backends.FakeSMBus``. In the ``raw`` transfer mode it is
+            used instead of ``/dev/i2c-N`` if it has a ``write_raw`` method.
+            Default: ``None``.
+        :type bus: object
 
         """
-        # Set own address and port.
+        # Set own address, port and bus backend.
         self._address = address
         self._port = port
+        self._bus = bus
 
         # Set i2c expander, 'PCF8574', 'MCP23008' and 'MCP23017' are supported.
         if i2c_expander in ['PCF8574', 'MCP23008', 'MCP23017']:
@@ -133,6 +170,14 @@ class CharLCD(BaseCharLCD):
         else:
             raise NotImplementedError('I2C expander "%s" is not supported.' % i2c_expander)
 
+        # Set transfer mode, batching relies on the PCF8574 latching every byte
+        if transfer_mode not in ['byte', 'block', 'raw']:
+            raise ValueError('Transfer mode must be one of `byte`, `block` or `raw`.')
+        if transfer_mode != 'byte' and self._i2c_expander != 'PCF8574':
+            raise NotImplementedError('Transfer mode "%s" is only supported with the PCF8574.'
+                                      % transfer_mode)
+        self._transfer_mode = transfer_mode
+
         # Errorchecking for expander parameters
         if expander_params is None:
             if self._i2c_expander == 'MCP23017':
@@ -148,10 +193,24 @@ class CharLCD(BaseCharLCD):
                 else:
                     raise ValueError('MCP23017: expander_params[\'gpio_bank\'] is \'%s\', '
                             'must be either \'A\' or \'B\'' % expander_params['gpio_bank'])
+                if expander_params.get('controllers', 1) in [1, 2]:
+                    self._expander_params['controllers'] = expander_params.get('controllers', 1)
+                else:
+                    raise ValueError('MCP23017: expander_params[\'controllers\'] is \'%s\', '
+                            'must be either 1 or 2' % expander_params['controllers'])
+            else:
+                self._expander_params = {}
 
         # Currently the I2C mode only supports 4 bit communication
         self.data_bus_mode = c.LCD_4BITMODE
 
+        # Enable bits of the selected controllers, None selects all of them
+        controllers = self._expander_params.get('controllers', 1)
+        if controllers == 1:
+            self._mcp_enable = {None: MCP230XX_E, 0: MCP230XX_E}
+        else:
+            self._mcp_enable = {None: MCP230XX_E | MCP230XX_E2, 0: MCP230XX_E, 1: MCP230XX_E2}
+
         # Set backlight status
         if self._i2c_expander == 'PCF8574':
             self._backlight = PCF8574_BACKLIGHT if backlight_enabled else PCF8574_NOBACKLIGHT
@@ -161,15 +220,27 @@ class CharLCD(BaseCharLCD):
         # Call superclass
         super(CharLCD, self).__init__(cols, rows, dotsize,
                                       charmap=charmap,
-                                      auto_linebreaks=auto_linebreaks)
+                                      auto_linebreaks=auto_linebreaks,
+                                      controllers=controllers)
         # Refresh backlight status
         self.backlight_enabled = backlight_enabled
 
     def _init_connection(self):
-        self.bus = SMBus(self._port)
+        if self._bus is not None:
+            self.bus = self._bus
+        elif SMBus is None:
+            raise ImportError('The smbus module is required unless a bus backend is passed in.')
+        else:
+            self.bus = SMBus(self._port)
+
+        # Raw writes go to the bus backend if it takes them, else to /dev/i2c-N
+        self._i2c_fd = None
+        if self._transfer_mode == 'raw' and not hasattr(self.bus, 'write_raw'):
+            self._i2c_fd = os.open('/dev/i2c-%d' % self._port, os.O_RDWR)
+            fcntl.ioctl(self._i2c_fd, I2C_SLAVE, self._address)
 
         if self._i2c_expander == 'PCF8574':
-            c.msleep(50)
+            self._sleep(c.POWER_ON_US)
         elif self._i2c_expander in ['MCP23008', 'MCP23017']:
             # Variable for storing data and applying bitmasks and shifting.
             self._mcp_data = 0
@@ -192,8 +263,9 @@ class CharLCD(BaseCharLCD):
             self.bus.write_byte_data(self._address, IODIR, 0x00)
 
     def _close_connection(self):
-        # Nothing to do here?
-        pass
+        if self._i2c_fd is not None:
+            os.close(self._i2c_fd)
+            self._i2c_fd = None
 
     # Properties
 
@@ -217,10 +289,17 @@ class CharLCD(BaseCharLCD):
     backlight_enabled = property(_get_backlight_enabled, _set_backlight_enabled,
             doc='Whether or not to enable the backlight. Either ``True`` or ``False``.')
 
+    def _instrument(self, stats):
+        self.bus = InstrumentedBackend(self.bus, stats)
+
     # Low level commands
 
     def _send_data(self, value):
-        if self._i2c_expander == 'PCF8574':
+        if self.stats is not None:
+            self.stats.count('data_bytes')
+        if self._transfer_mode != 'byte':
+            self._write_block(self._waveform(value, c.RS_DATA))
+        elif self._i2c_expander == 'PCF8574':
             self.bus.write_byte(self._address, (c.RS_DATA | (value & 0xF0)) | self._backlight)
             self._pulse_data(c.RS_DATA | (value & 0xF0))
             self.bus.write_byte(self._address, (c.RS_DATA |
@@ -232,7 +311,11 @@ class CharLCD(BaseCharLCD):
             self._pulse_data(value & 0x0F)
 
     def _send_instruction(self, value):
-        if self._i2c_expander == 'PCF8574':
+        if self.stats is not None:
+            self.stats.count('commands')
+        if self._transfer_mode != 'byte':
+            self._write_block(self._waveform(value, c.RS_INSTRUCTION))
+        elif self._i2c_expander == 'PCF8574':
             self.bus.write_byte(self._address, (c.RS_INSTRUCTION |
                                                (value & 0xF0)) | self._backlight)
             self._pulse_data(c.RS_INSTRUCTION | (value & 0xF0))
@@ -248,20 +331,74 @@ class CharLCD(BaseCharLCD):
         """Pulse the `enable` flag to process value."""
         if self._i2c_expander == 'PCF8574':
             self.bus.write_byte(self._address, ((value & ~PCF8574_E) | self._backlight))
-            c.usleep(1)
+            self._sleep(1)
             self.bus.write_byte(self._address, value | PCF8574_E | self._backlight)
-            c.usleep(1)
+            self._sleep(1)
             self.bus.write_byte(self._address, ((value & ~PCF8574_E) | self._backlight))
-            c.usleep(100)
+            self._sleep(100)
         elif self._i2c_expander in ['MCP23008', 'MCP23017']:
+            enable = self._mcp_enable[self._controller]
+            if self.controllers > 1:
+                self._wait_controller()
             self._mcp_data &= ~MCP230XX_DATAMASK
             self._mcp_data |= value << MCP230XX_DATASHIFT
-            self._mcp_data &= ~MCP230XX_E
+            self._mcp_data &= ~enable
             self.bus.write_byte_data(self._address, self._mcp_gpio, self._mcp_data)
-            c.usleep(1)
-            self._mcp_data |= MCP230XX_E
+            self._sleep(1)
+            self._mcp_data |= enable
             self.bus.write_byte_data(self._address, self._mcp_gpio, self._mcp_data)
-            c.usleep(1)
-            self._mcp_data &= ~MCP230XX_E
+            self._sleep(1)
+            self._mcp_data &= ~enable
             self.bus.write_byte_data(self._address, self._mcp_gpio, self._mcp_data)
-            c.usleep(100)
+            if self.controllers > 1:
+                # Meanwhile the other controller can be written
+                self._mark_busy(100)
+            else:
+                self._sleep(100)
+
+    # Batched transfers
+
+    def _send_block(self, instruction, values):
+        if self._transfer_mode == 'byte':
+            return super(CharLCD, self)._send_block(instruction, values)
+        if self.stats is not None:
+            self.stats.count('commands')
+            self.stats.count('data_bytes', len(values))
+        buf = self._waveform(instruction, c.RS_INSTRUCTION)
+        for value in values:
+            buf.extend(self._waveform(value, c.RS_DATA))
+        self._write_block(buf)
+
+    def _waveform(self, value, mode):
+        """Return the PCF8574 port states that clock one byte into the display.
+
+        Every nibble needs three states: data with E low, E high, E low. At
+        100 kHz one state takes ~90us on the bus, so the pulse width and the
+        37us execution time of the controller are met without any sleeps.
+        """
+        buf = []
+        for nibble in (value & 0xF0, (value << 4) & 0xF0):
+            state = mode | nibble | self._backlight
+            buf.extend((state, state | PCF8574_E, state))
+        return buf
+
+    def _write_block(self, buf):
+        """Push a buffer of port states to the expander in as few transfers
+        as possible."""
+        if self._transfer_mode == 'raw':
+            for i in range(0, len(buf), I2C_RAW_MAX):
+                if self._i2c_fd is None:
+                    self.bus.write_raw(self._address, buf[i:i + I2C_RAW_MAX])
+                elif self.stats is None:
+                    os.write(self._i2c_fd, bytearray(buf[i:i + I2C_RAW_MAX]))
+                else:
+                    start = default_timer()
+                    size = os.write(self._i2c_fd, bytearray(buf[i:i + I2C_RAW_MAX]))
+                    self.stats.transaction(default_timer() - start, size)
+            return
+        for i in range(0, len(buf), I2C_BLOCK_MAX + 1):
+            chunk = buf[i:i + I2C_BLOCK_MAX + 1]
+            if len(chunk) == 1:
+                self.bus.write_byte(self._address, chunk[0])
+            else:
+                self.bus.write_i2c_block_data(self._address, chunk[0], chunk[1:])
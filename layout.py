@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import re
+import time
+from collections import namedtuple
+from string import Formatter
+
+from . import codecs
+
+
+Slot = namedtuple('Slot', 'name row col width spec')
+
+# [[fill]align][sign][#][0][width]... of a format spec
+_WIDTH_RE = re.compile(r'^(?:.?[<>=^])?[-+ ]?#?0?(\d+)')
+
+
+class Layout(object):
+
+    def __init__(self, lines, cols=20, fallback='N/A', refresh=None):
+        """
+        Declarative screen layout: fixed text with named fields.
+
+        Every line is a format string like ``'Targ. Temp:{target:6.2f}°{unit:1}'``.
+        Each field needs a width in its format spec. Formatted values are cut
+        off or padded to that width, so a field never moves the text around it.
+
+        Fields listed in ``refresh`` are periodic, like clocks and timers:
+        their values are only taken again when their period is over. All
+        other fields are taken on every render call, but only encoded when
+        they changed, e.g. temperatures after a sensor update and names after
+        a config change.
+
+        Args:
+            lines:
+                The format strings, one per row.
+            cols:
+                Number of columns per row. Default: ``20``.
+            fallback:
+                Text shown in a field whose value can't be formatted with its
+                spec, e.g. ``None`` for a float. Default: ``N/A``.
+            refresh:
+                Dict of field names and their refresh periods in seconds.
+                Periodic fields are due at multiples of their period, so a
+                clock with a period of ``1`` changes on the full second.
+                Default: ``None``.
+
+        """
+        self.lines = list(lines)
+        self.cols = cols
+        self.fallback = fallback
+        self.refresh = dict(refresh or {})
+        self.text = []
+        self.slots = []
+        for row, line in enumerate(self.lines):
+            text = ''
+            for literal, name, spec, conversion in Formatter().parse(line):
+                text += literal
+                if name is None:
+                    continue
+                match = _WIDTH_RE.match(spec or '')
+                if not name or conversion or not match:
+                    raise ValueError('Field {%s} in %r needs a name and a width.' % (name, line))
+                width = int(match.group(1))
+                self.slots.append(Slot(name, row, len(text), width, spec))
+                text += ' ' * width
+            if len(text) > cols:
+                raise ValueError('Line %r is longer than %d columns.' % (line, cols))
+            self.text.append(text.ljust(cols))
+
+    def compile(self, codec):
+        """Return the layout compiled for the specified ``Codec``."""
+        return CompiledLayout(self, codec)
+
+
+class CompiledLayout(object):
+
+    def __init__(self, layout, codec):
+        """
+        A layout with its fixed text encoded once.
+
+        Use ``Layout.compile()`` to create it. ``render()`` formats and
+        encodes only the fields whose values changed since the last call.
+        """
+        self.layout = layout
+        self.codec = codec
+        self._rows = [codec.encode(text) for text in layout.text]
+        for row in self._rows:
+            if codecs.CR in row or codecs.LF in row:
+                raise ValueError('Layouts must not contain line breaks.')
+            if len(row) != layout.cols:
+                raise ValueError('Combined characters are not supported in the fixed text of layouts.')
+        self._values = {}
+        self._due = {}
+
+    def render(self, values, now=None):
+        """
+        Return the frame for the specified field values as rows of raw bytes,
+        ready for ``DisplayWriter.submit()``.
+
+        A value may be a function without arguments. It is only called when
+        the field is due, which saves formatting a clock or timer that did
+        not advance yet.
+        """
+        if now is None:
+            now = time.time()
+        for slot in self.layout.slots:
+            period = self.layout.refresh.get(slot.name)
+            if period:
+                if slot in self._values and now < self._due[slot]:
+                    continue
+                self._due[slot] = (now // period + 1) * period
+            value = values.get(slot.name)
+            if callable(value):
+                value = value()
+            if slot in self._values and self._values[slot] == value:
+                continue
+            self._values[slot] = value
+            encoded = self.codec.encode(self._format(slot, value))
+            encoded = encoded[:slot.width] + [0x20] * (slot.width - len(encoded))
+            self._rows[slot.row][slot.col:slot.col + slot.width] = encoded
+        return [row[:] for row in self._rows]
+
+    def next_due(self):
+        """
+        Return the time when the next periodic field is due, or ``None`` if
+        the layout has no periodic fields.
+        """
+        return min(self._due.values()) if self._due else None
+
+    def _format(self, slot, value):
+        try:
+            text = format('' if value is None else value, slot.spec)
+        except (TypeError, ValueError):
+            text = format(self.layout.fallback, '>%d' % slot.width)
+        # Line breaks would corrupt the encoded row, show them as spaces
+        text = text.replace('\r', ' ').replace('\n', ' ')
+        return text[:slot.width].ljust(slot.width)
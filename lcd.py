@@ -26,7 +26,9 @@ from collections import namedtuple
 
 from . import codecs
 from . import common as c
-from .compat import range
+from .compat import range, perf_counter_ns
+from .glyphs import GlyphManager, GLYPH_BASE
+from .stats import DriverStats
 
 
 LCDConfig = namedtuple('LCDConfig', 'rows cols dotsize')
@@ -38,7 +40,8 @@ class BaseCharLCD(object):
 
     # Init, setup, teardown
 
-    def __init__(self, cols=20, rows=4, dotsize=8, charmap='A02', auto_linebreaks=True):
+    def __init__(self, cols=20, rows=4, dotsize=8, charmap='A02', auto_linebreaks=True,
+                 controllers=1):
         """
         Character LCD controller. Base class only, you should use a subclass.
 
@@ -56,9 +59,15 @@ class BaseCharLCD(object):
             auto_linebreaks:
                 Whether or not to automatically insert line breaks.
                 Default: True.
+            controllers:
+                Number of HD44780 controllers, each with its own enable line.
+                The rows are split evenly between them, e.g. a 40x4 display
+                has two controllers with two rows each. Default: 1.
 
         """
         assert dotsize in [8, 10], 'The ``dotsize`` argument should be either 8 or 10.'
+        if controllers < 1 or rows % controllers:
+            raise ValueError('The rows must be split evenly between the controllers.')
 
         # Initialize codec
         if charmap == 'A00':
@@ -72,24 +81,50 @@ class BaseCharLCD(object):
         # LCD configuration
         self.lcd = LCDConfig(rows=rows, cols=cols, dotsize=dotsize)
 
+        # Controller and DDRAM address of the first character of every row
+        self.controllers = controllers
+        controller_rows = rows // controllers
+        offsets = (0x00, 0x40, cols, 0x40 + cols)
+        self._row_offsets = tuple(offsets[row % controller_rows] for row in range(rows))
+        self._row_controllers = tuple(row // controller_rows for row in range(rows))
+
+        # Controller the next transfer goes to, None for all of them, and
+        # when each controller has executed its last instruction
+        self._controller = None
+        self._ready_at = [0] * controllers
+
         # Setup initial display configuration
         displayfunction = self.data_bus_mode | c.LCD_5x8DOTS
-        if rows == 1:
+        if controller_rows == 1:
             displayfunction |= c.LCD_1LINE
-        elif rows in [2, 4]:
+        elif controller_rows in [2, 4]:
             # LCD only uses two lines on 4 row displays
             displayfunction |= c.LCD_2LINE
         if dotsize == 10:
             # For some 1 line displays you can select a 10px font.
             displayfunction |= c.LCD_5x10DOTS
 
-        # Create content cache
+        # Create content cache and off-screen framebuffer
         self._content = [[0x20] * cols for _ in range(rows)]
+        self._framebuffer = [[0x20] * cols for _ in range(rows)]
+
+        # Whether the DDRAM address counter of the display matches _cursor_pos
+        self._ddram_synced = True
+
+        # Bitmaps loaded into the CGRAM locations and custom glyphs
+        self._cgram = [None] * 8
+        self.glyphs = GlyphManager(self)
 
         # Set up auto linebreaks
         self.auto_linebreaks = auto_linebreaks
         self.recent_auto_linebreak = False
 
+        # Counters and timings, see enable_stats()
+        self.stats = None
+
+        # Measure the sleep overhead of this system once, for the delays below
+        c.calibrate_delay()
+
         # Initialize display
         self._init_connection()
 
@@ -97,47 +132,70 @@ class BaseCharLCD(object):
         if self.data_bus_mode == c.LCD_4BITMODE:
             # Hitachi manual page 46
             self.command(0x03)
-            c.msleep(4.5)
+            self._sleep(c.INIT_WAIT_US)
             self.command(0x03)
-            c.msleep(4.5)
+            self._sleep(c.INIT_WAIT_US)
             self.command(0x03)
-            c.usleep(100)
+            self._sleep(c.INIT_WAIT2_US)
             self.command(0x02)
         elif self.data_bus_mode == c.LCD_8BITMODE:
             # Hitachi manual page 45
             self.command(0x30)
-            c.msleep(4.5)
+            self._sleep(c.INIT_WAIT_US)
             self.command(0x30)
-            c.usleep(100)
+            self._sleep(c.INIT_WAIT2_US)
             self.command(0x30)
         else:
             raise ValueError('Invalid data bus mode: {}'.format(self.data_bus_mode))
 
         # Write configuration to display
         self.command(c.LCD_FUNCTIONSET | displayfunction)
-        c.usleep(50)
+        self._wait_ready(50)
 
         # Configure display mode
         self._display_mode = c.LCD_DISPLAYON
         self._cursor_mode = c.CursorMode.hide
         self.command(c.LCD_DISPLAYCONTROL | self._display_mode | self._cursor_mode)
-        c.usleep(50)
+        self._wait_ready(50)
 
         # Clear display
         self.clear()
 
         # Configure entry mode
         self._text_align_mode = c.Alignment.left
+        self._cursor_step = 1  # Column increment per written character, -1 if right aligned
         self._display_shift_mode = c.ShiftMode.cursor
         self._cursor_pos = (0, 0)
         self.command(c.LCD_ENTRYMODESET | self._text_align_mode | self._display_shift_mode)
-        c.usleep(50)
+        self._wait_ready(50)
 
     def close(self, clear=False):
         if clear:
             self.clear()
         self._close_connection()
 
+    def enable_stats(self, stats=None):
+        """
+        Count commands, data bytes and bus transactions and time the
+        commands, writes, flushes and delays of this display.
+
+        Args:
+            stats:
+                A ``stats.DriverStats`` to add to, e.g. one shared by all
+                displays on the same bus. Default: a new one.
+
+        Returns the ``DriverStats``. Calling this again has no effect.
+        """
+        if self.stats is None:
+            self.stats = stats if stats is not None else DriverStats()
+            self._instrument(self.stats)
+        return self.stats
+
+    def _instrument(self, stats):
+        """Count the transactions of the bus backend in ``stats``.
+        Subclasses override this."""
+        pass
+
     # Properties
 
     def _get_cursor_pos(self):
@@ -146,13 +204,11 @@ class BaseCharLCD(object):
     def _set_cursor_pos(self, value):
         if not hasattr(value, '__getitem__') or len(value) != 2:
             raise ValueError('Cursor position should be determined by a 2-tuple.')
-        if value[0] not in range(self.lcd.rows) or value[1] not in range(self.lcd.cols):
+        row, col = value
+        if not (0 <= row < self.lcd.rows and 0 <= col < self.lcd.cols):
             msg = 'Cursor position {pos!r} invalid on a {lcd.rows}x{lcd.cols} LCD.'
             raise ValueError(msg.format(pos=value, lcd=self.lcd))
-        row_offsets = [0x00, 0x40, self.lcd.cols, 0x40 + self.lcd.cols]
-        self._cursor_pos = value
-        self.command(c.LCD_SETDDRAMADDR | row_offsets[value[0]] + value[1])
-        c.usleep(50)
+        self._move_cursor(row, col)
 
     cursor_pos = property(_get_cursor_pos, _set_cursor_pos,
             doc='The cursor position as a 2-tuple (row, col).')
@@ -168,12 +224,14 @@ class BaseCharLCD(object):
     def _set_text_align_mode(self, value):
         if value == 'left':
             self._text_align_mode = c.Alignment.left
+            self._cursor_step = 1
         elif value == 'right':
             self._text_align_mode = c.Alignment.right
+            self._cursor_step = -1
         else:
             raise ValueError('Text align mode must be either `left` or `right`')
         self.command(c.LCD_ENTRYMODESET | self._text_align_mode | self._display_shift_mode)
-        c.usleep(50)
+        self._wait_ready(50)
 
     text_align_mode = property(_get_text_align_mode, _set_text_align_mode,
             doc='The text alignment (``left`` or ``right``).')
@@ -194,7 +252,7 @@ class BaseCharLCD(object):
         else:
             raise ValueError('Write shift mode must be either `cursor` or `display`.')
         self.command(c.LCD_ENTRYMODESET | self._text_align_mode | self._display_shift_mode)
-        c.usleep(50)
+        self._wait_ready(50)
 
     write_shift_mode = property(_get_write_shift_mode, _set_write_shift_mode,
             doc='The shift mode when writing (``cursor`` or ``display``).')
@@ -205,7 +263,7 @@ class BaseCharLCD(object):
     def _set_display_enabled(self, value):
         self._display_mode = c.LCD_DISPLAYON if value else c.LCD_DISPLAYOFF
         self.command(c.LCD_DISPLAYCONTROL | self._display_mode | self._cursor_mode)
-        c.usleep(50)
+        self._wait_ready(50)
 
     display_enabled = property(_get_display_enabled, _set_display_enabled,
             doc='Whether or not to display any characters.')
@@ -221,6 +279,9 @@ class BaseCharLCD(object):
             raise ValueError('Internal _cursor_mode has invalid value.')
 
     def _set_cursor_mode(self, value):
+        if self.controllers > 1 and value != 'hide':
+            # Every controller would show a cursor at its own address counter
+            raise NotImplementedError('Only a hidden cursor is supported with more than one controller.')
         if value == 'hide':
             self._cursor_mode = c.CursorMode.hide
         elif value == 'line':
@@ -229,12 +290,22 @@ class BaseCharLCD(object):
             self._cursor_mode = c.CursorMode.blink
         else:
             raise ValueError('Cursor mode must be one of `hide`, `line` or `blink`.')
+        if self._cursor_mode != c.CursorMode.hide:
+            # Make sure the visible cursor shows up where we think it is
+            self._sync_cursor()
         self.command(c.LCD_DISPLAYCONTROL | self._display_mode | self._cursor_mode)
-        c.usleep(50)
+        self._wait_ready(50)
 
     cursor_mode = property(_get_cursor_mode, _set_cursor_mode,
             doc='How the cursor should behave (``hide``, ``line`` or ``blink``).')
 
+    def _get_framebuffer(self):
+        return self._framebuffer
+
+    framebuffer = property(_get_framebuffer,
+            doc='The off-screen framebuffer as a list of rows of raw bytes. '
+                'Changes are sent to the display on ``flush()``.')
+
     # High level commands
 
     def write_string(self, value):
@@ -297,7 +368,7 @@ class BaseCharLCD(object):
                 else:
                     self.cursor_pos = (0, col)
             elif char == codecs.CR:
-                if self.text_align_mode == 'left':
+                if self._cursor_step > 0:
                     self.cursor_pos = (row, 0)
                 else:
                     self.cursor_pos = (row, self.lcd.cols - 1)
@@ -306,14 +377,17 @@ class BaseCharLCD(object):
         """Overwrite display with blank characters and reset cursor position."""
         self.command(c.LCD_CLEARDISPLAY)
         self._cursor_pos = (0, 0)
+        self._ddram_synced = True
         self._content = [[0x20] * self.lcd.cols for _ in range(self.lcd.rows)]
-        c.msleep(2)
+        self._framebuffer = [[0x20] * self.lcd.cols for _ in range(self.lcd.rows)]
+        self._wait_ready(2000)
 
     def home(self):
         """Set cursor to initial position and reset any shifting."""
         self.command(c.LCD_RETURNHOME)
         self._cursor_pos = (0, 0)
-        c.msleep(2)
+        self._ddram_synced = True
+        self._wait_ready(2000)
 
     def shift_display(self, amount):
         """Shift the display. Use negative amounts to shift left and positive
@@ -323,7 +397,7 @@ class BaseCharLCD(object):
         direction = c.LCD_MOVERIGHT if amount > 0 else c.LCD_MOVELEFT
         for i in range(abs(amount)):
             self.command(c.LCD_CURSORSHIFT | c.LCD_DISPLAYMOVE | direction)
-            c.usleep(50)
+            self._wait_ready(50)
 
     def create_char(self, location, bitmap):
         """Create a new character.
@@ -359,34 +433,239 @@ class BaseCharLCD(object):
         assert 0 <= location <= 7, 'Only locations 0-7 are valid.'
         assert len(bitmap) == 8, 'Bitmap should have exactly 8 rows.'
 
-        # Store previous position
-        pos = self.cursor_pos
+        # The glyph manager must not evict this character
+        self.glyphs.reserve(location)
+        self._load_char(location, bitmap)
 
-        # Write character to CGRAM
-        self.command(c.LCD_SETCGRAMADDR | location << 3)
-        for row in bitmap:
-            self._send_data(row)
+    # Framebuffer commands
 
-        # Restore cursor pos
-        self.cursor_pos = pos
+    def draw(self, row, col, value):
+        """
+        Render the specified unicode string into the framebuffer, starting at
+        ``(row, col)``. Nothing is sent to the display until ``flush()`` is
+        called. Text that does not fit into the row is cut off.
+
+        Line breaks are not supported here, draw every row separately.
+
+        """
+        if not (0 <= row < self.lcd.rows and 0 <= col < self.lcd.cols):
+            msg = 'Position {pos!r} invalid on a {lcd.rows}x{lcd.cols} LCD.'
+            raise ValueError(msg.format(pos=(row, col), lcd=self.lcd))
+        encoded = self.codec.encode(value)
+        if codecs.CR in encoded or codecs.LF in encoded:
+            raise ValueError('Line breaks can not be drawn into the framebuffer.')
+        encoded = encoded[:self.lcd.cols - col]
+        self._framebuffer[row][col:col + len(encoded)] = encoded
+
+    def write_frame(self, lines):
+        """
+        Replace the whole framebuffer with the specified lines and flush it.
+
+        Lines are either unicode strings or sequences of raw bytes that are
+        already encoded for the charmap. They are padded with spaces or cut
+        off to the display width, missing lines are blanked.
+
+        """
+        cols = self.lcd.cols
+        for row in range(self.lcd.rows):
+            line = lines[row] if row < len(lines) else ''
+            if isinstance(line, (list, tuple, bytearray)):
+                encoded = list(line[:cols])
+                self._framebuffer[row][:] = encoded + [0x20] * (cols - len(encoded))
+                continue
+            self._framebuffer[row][:] = [0x20] * cols
+            if line:
+                self.draw(row, 0, line)
+        self.flush()
+
+    def flush(self):
+        """
+        Send the framebuffer to the display.
+
+        Only cells that differ from the current display content are sent. Each
+        contiguous run of changed cells costs a single DDRAM address
+        instruction followed by a burst of data bytes.
+
+        """
+        if self.stats is None:
+            self._flush()
+        else:
+            with self.stats.timed('flush'):
+                self._flush()
+
+    def _flush(self):
+        self.glyphs.resolve(self._framebuffer)
+        reverse = self._text_align_mode == c.Alignment.right
+        runs = [[] for _ in range(self.controllers)]  # DDRAM address and bytes, per controller
+        for row in range(self.lcd.rows):
+            wanted = self._framebuffer[row]
+            for start, end in _dirty_runs(wanted, self._content[row]):
+                values = wanted[start:end]
+                if reverse:
+                    # The address counter decrements, so write the run backwards
+                    address = self._ddram_address(row, end - 1)
+                    runs[self._row_controllers[row]].append((address, values[::-1]))
+                else:
+                    address = self._ddram_address(row, start)
+                    runs[self._row_controllers[row]].append((address, values))
+                self._content[row][start:end] = values
+                self._ddram_synced = False
+        if self.controllers == 1:
+            for address, values in runs[0]:
+                self._send_block(c.LCD_SETDDRAMADDR | address, values)
+        else:
+            self._send_interleaved(runs)
+        if self._cursor_mode != c.CursorMode.hide:
+            self._sync_cursor()
 
     # Mid level commands
 
     def command(self, value):
-        """Send a raw command to the LCD."""
-        self._send_instruction(value)
+        """Send a raw command to the LCD. With more than one controller,
+        setting the DDRAM address goes to the controller of the last written
+        row, every other instruction to all controllers."""
+        if not value & c.LCD_SETDDRAMADDR:
+            self._controller = None
+        if self.stats is None:
+            self._send_instruction(value)
+        else:
+            with self.stats.timed('command'):
+                self._send_instruction(value)
+
+    def _wait_ready(self, microseconds):
+        """Wait until the controller is ready for the next instruction.
+        With more than one controller, only the next transfer to the same
+        controller waits, see ``_wait_controller()``. Subclasses that can
+        read the busy flag override this."""
+        if self.controllers > 1:
+            self._mark_busy(microseconds)
+        else:
+            self._sleep(microseconds)
+
+    def _mark_busy(self, microseconds):
+        """Note that the selected controllers execute an instruction for the
+        next ``microseconds``."""
+        ready_at = perf_counter_ns() + int(microseconds * 1000)
+        selected = range(self.controllers) if self._controller is None else (self._controller,)
+        for controller in selected:
+            if ready_at > self._ready_at[controller]:
+                self._ready_at[controller] = ready_at
+
+    def _wait_controller(self):
+        """Wait until the selected controllers have executed their last
+        instruction. Subclasses call this before every enable pulse if there
+        is more than one controller."""
+        if self._controller is None:
+            ready_at = max(self._ready_at)
+        else:
+            ready_at = self._ready_at[self._controller]
+        remaining = ready_at - perf_counter_ns()
+        if remaining > 0:
+            self._sleep(remaining / 1000)
+
+    def _sleep(self, microseconds):
+        """Wait for the display, the time counts as sleeping."""
+        if self.stats is None:
+            c.usleep(microseconds)
+        else:
+            with self.stats.timed('sleep', 'sleep_time'):
+                c.usleep(microseconds)
+
+    def _ddram_address(self, row, col):
+        return self._row_offsets[row] + col
+
+    def _move_cursor(self, row, col):
+        """Move the cursor to a valid position."""
+        self._cursor_pos = (row, col)
+        self._controller = self._row_controllers[row]
+        self.command(c.LCD_SETDDRAMADDR | self._row_offsets[row] + col)
+        self._ddram_synced = True
+        self._wait_ready(50)
+
+    def _sync_cursor(self):
+        """Move the DDRAM address counter to the cursor position if writes
+        of unchanged characters have been skipped."""
+        if not self._ddram_synced:
+            row, col = self._cursor_pos
+            self._controller = self._row_controllers[row]
+            self.command(c.LCD_SETDDRAMADDR | self._ddram_address(row, col))
+            self._ddram_synced = True
+            self._wait_ready(50)
+
+    def _load_char(self, location, bitmap):
+        """Write a bitmap into a CGRAM location, unless it is already there."""
+        bitmap = tuple(bitmap)
+        if self._cgram[location] == bitmap:
+            return
+        self._send_block(c.LCD_SETCGRAMADDR | location << 3, bitmap)
+        self._cgram[location] = bitmap
+        # The address counter points into CGRAM now, the next write moves it back
+        self._ddram_synced = False
+
+    def _send_block(self, instruction, values):
+        """Send an instruction followed by a burst of data bytes. Subclasses
+        may override this to batch the transfer."""
+        self.command(instruction)
+        self._wait_ready(50)
+        for value in values:
+            self._send_data(value)
+
+    def _send_interleaved(self, runs):
+        """
+        Send the runs of DDRAM address and bytes of every controller, one
+        transfer to each controller in turn.
+
+        Every controller has its own address counter, so the transfers can
+        be mixed freely. While one controller executes a byte the next one
+        is already sent to the other, instead of waiting for it.
+
+        """
+        transfers = []
+        for controller_runs in runs:
+            controller_transfers = []
+            for address, values in controller_runs:
+                controller_transfers.append((c.RS_INSTRUCTION, c.LCD_SETDDRAMADDR | address))
+                controller_transfers.extend((c.RS_DATA, value) for value in values)
+            transfers.append(controller_transfers)
+        for i in range(max(len(t) for t in transfers)):
+            for controller, controller_transfers in enumerate(transfers):
+                if i >= len(controller_transfers):
+                    continue
+                mode, value = controller_transfers[i]
+                self._controller = controller
+                if mode == c.RS_INSTRUCTION:
+                    self.command(value)
+                    self._wait_ready(50)
+                else:
+                    self._send_data(value)
 
     def write(self, value):  # type: (int) -> None
         """Write a raw byte to the LCD."""
+        if self.stats is None:
+            self._write(value)
+        else:
+            with self.stats.timed('write'):
+                self._write(value)
 
+    def _write(self, value):  # type: (int) -> None
         # Get current position
         row, col = self._cursor_pos
 
+        # Custom glyphs shown elsewhere on the display must stay loaded
+        if value >= GLYPH_BASE:
+            visible = set(v for line in self._content for v in line if v < 8)
+            value = self.glyphs.location(value, pinned=visible)
+
+        # Data goes to the controller of the row only
+        self._controller = self._row_controllers[row]
+
         # Write byte if changed
         try:
             if self._content[row][col] != value:
+                self._sync_cursor()
                 self._send_data(value)
                 self._content[row][col] = value  # Update content cache
+                self._framebuffer[row][col] = value
                 unchanged = False
             else:
                 unchanged = True
@@ -394,42 +673,25 @@ class BaseCharLCD(object):
             # Position out of range
             if self.auto_linebreaks is True:
                 raise e
+            self._sync_cursor()
             self._send_data(value)
             unchanged = False
 
-        # Update cursor position.
-        if self.text_align_mode == 'left':
-            if self.auto_linebreaks is False or col < self.lcd.cols - 1:
-                # No newline, update internal pointer
-                newpos = (row, col + 1)
-                if unchanged:
-                    self.cursor_pos = newpos
-                else:
-                    self._cursor_pos = newpos
-                self.recent_auto_linebreak = False
-            else:
-                # Newline, reset pointer
-                if row < self.lcd.rows - 1:
-                    self.cursor_pos = (row + 1, 0)
-                else:
-                    self.cursor_pos = (0, 0)
-                self.recent_auto_linebreak = True
+        # Update cursor position, in the direction of the text alignment
+        step = self._cursor_step
+        cols = self.lcd.cols
+        if self.auto_linebreaks is False or 0 <= col + step < cols:
+            # No newline, update internal pointer
+            self._cursor_pos = (row, col + step)
+            if unchanged:
+                # Address counter is only moved on the next real write
+                self._ddram_synced = False
+            self.recent_auto_linebreak = False
         else:
-            if self.auto_linebreaks is False or col > 0:
-                # No newline, update internal pointer
-                newpos = (row, col - 1)
-                if unchanged:
-                    self.cursor_pos = newpos
-                else:
-                    self._cursor_pos = newpos
-                self.recent_auto_linebreak = False
-            else:
-                # Newline, reset pointer
-                if row < self.lcd.rows - 1:
-                    self.cursor_pos = (row + 1, self.lcd.cols - 1)
-                else:
-                    self.cursor_pos = (0, self.lcd.cols - 1)
-                self.recent_auto_linebreak = True
+            # Newline, continue at the start of the next row
+            row = row + 1 if row < self.lcd.rows - 1 else 0
+            self._move_cursor(row, 0 if step > 0 else cols - 1)
+            self.recent_auto_linebreak = True
 
     def cr(self):  # type: () -> None
         """Write a carriage return (``\\r``) character to the LCD."""
@@ -442,3 +704,29 @@ class BaseCharLCD(object):
     def crlf(self):  # type: () -> None
         """Write a line feed and a carriage return (``\\r\\n``) character to the LCD."""
         self.write_string('\r\n')
+
+
+# # # HELPERS # # #
+
+def _dirty_runs(wanted, current, max_gap=1):
+    """
+    Return ``(start, end)`` tuples of the column ranges where ``wanted``
+    differs from ``current``.
+
+    Runs separated by no more than ``max_gap`` unchanged cells are merged,
+    rewriting a single unchanged byte is cheaper than another address
+    instruction.
+    """
+    runs = []
+    start = end = None
+    for col, (new, old) in enumerate(zip(wanted, current)):
+        if new != old:
+            if start is None:
+                start = col
+            end = col + 1
+        elif start is not None and col - end >= max_gap:
+            runs.append((start, end))
+            start = None
+    if start is not None:
+        runs.append((start, end))
+    return runs
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import logging
+import threading
+import time
+
+
+module_logger = logging.getLogger(__name__)
+
+# Results of DisplayScheduler.wait_update()
+TIMEOUT = 'timeout'
+UPDATED = 'updated'
+SWITCHED = 'switched'
+
+
+class _Lane(object):
+    """Selected mode and render loop of one display."""
+
+    def __init__(self, display):
+        self.display = display
+        self.mode = None
+        self.render = None
+        self.args = ()
+        self.interval = 0
+        self.generation = 0
+        self.render_generation = 0
+        self.updated = False
+        self.last_update = 0
+        self.thread = None
+
+
+class DisplayScheduler(object):
+
+    def __init__(self, name='lcdscheduler', min_interval=0.1, logger=None):
+        """
+        Runs the render loops of the selected display modes, one long-lived
+        thread per display.
+
+        A mode is a render function that draws one cycle of its screen, for
+        example all pages of a multidisplay. The scheduler calls it again and
+        again until another mode is selected for the same display. Render
+        functions should pause with ``wait()``, which returns early when the
+        mode is switched. A render function may return the time when it has
+        to be called again, e.g. when the next second of a clock is due.
+        Otherwise it is called again after the interval of the mode.
+
+        Every display has its own mode, selected with the ``display``
+        argument of ``select()``. ``wait()`` and ``wait_update()`` apply to
+        the display of the calling render loop.
+
+        With ``event_driven`` set, producers report changed data with
+        ``notify_update()``. This ends the pause between two render calls and
+        ``wait_update()`` in render functions of all displays early, but not
+        more often than every ``min_interval`` seconds.
+
+        Args:
+            name:
+                Name of the scheduler threads, followed by the display if it
+                is not the default one. Default: ``lcdscheduler``.
+            min_interval:
+                Minimum time in seconds between two calls of a render
+                function or two redraws after updates. Default: ``0.1``.
+            logger:
+                Logger for failed render calls. Default: the module logger.
+
+        """
+        self.name = name
+        self.min_interval = min_interval
+        self.logger = logger or module_logger
+        self.event_driven = False
+        self._lanes = {}
+        self._local = threading.local()
+        self._running = False
+        self._cond = threading.Condition()
+
+    @property
+    def mode(self):
+        """The name of the mode selected for the default display or ``None``."""
+        return self.mode_of(None)
+
+    def mode_of(self, display):
+        """Return the name of the mode selected for a display or ``None``."""
+        lane = self._lanes.get(display)
+        return lane.mode if lane is not None else None
+
+    def start(self):
+        """Start the scheduler threads."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            for lane in self._lanes.values():
+                self._start_lane(lane)
+
+    def stop(self, timeout=None):
+        """Stop the scheduler threads after the current render calls."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            threads = [lane.thread for lane in self._lanes.values() if lane.thread is not None]
+            for lane in self._lanes.values():
+                lane.thread = None
+        for thread in threads:
+            thread.join(timeout)
+
+    def select(self, mode, render, args=(), interval=0, display=None):
+        """
+        Switch a display to a mode. Selecting the mode that is already
+        running with the same arguments does nothing.
+
+        Args:
+            mode:
+                Name of the mode.
+            render:
+                Function that draws one cycle of the mode.
+            args:
+                Arguments passed to ``render``.
+            interval:
+                Time in seconds to wait between two calls of ``render`` if
+                it does not return the time of its next call.
+            display:
+                Name of the display. Default: ``None``, the default display.
+
+        """
+        args = tuple(args)
+        with self._cond:
+            lane = self._lanes.get(display)
+            if lane is None:
+                lane = self._lanes[display] = _Lane(display)
+                if self._running:
+                    self._start_lane(lane)
+            if mode == lane.mode and args == lane.args:
+                return
+            lane.mode = mode
+            lane.render = render
+            lane.args = args
+            lane.interval = interval
+            lane.generation += 1
+            self._cond.notify_all()
+        self.logger.debug('Display mode %s selected for display %s', mode, display)
+
+    def notify_update(self, *args, **kwargs):
+        """Report that data shown on the displays has changed."""
+        with self._cond:
+            for lane in self._lanes.values():
+                lane.updated = True
+            if self.event_driven:
+                self._cond.notify_all()
+
+    def wait(self, seconds):
+        """
+        Sleep for the specified amount of seconds.
+
+        Returns ``False`` as soon as another mode has been selected for the
+        display since the current render call started, or the scheduler is
+        stopped, ``True`` otherwise.
+        """
+        lane = self._local.lane
+        with self._cond:
+            return self._wait(lane, lane.render_generation, seconds)
+
+    def wait_update(self, seconds):
+        """
+        Like ``wait()``, but also returns early after ``notify_update()`` in
+        event driven mode.
+
+        Returns ``SWITCHED`` if another mode has been selected, ``UPDATED``
+        if data has changed and ``TIMEOUT`` otherwise.
+        """
+        lane = self._local.lane
+        with self._cond:
+            return self._wait_update(lane, lane.render_generation, seconds)
+
+    def _start_lane(self, lane):
+        # Must be called with the condition held
+        name = self.name if lane.display is None else '%s-%s' % (self.name, lane.display)
+        lane.thread = threading.Thread(target=self._run, args=(lane,), name=name)
+        lane.thread.daemon = True
+        lane.thread.start()
+
+    def _wait_update(self, lane, generation, seconds):
+        # Must be called with the condition held
+        deadline = time.time() + seconds
+        while self._running and generation == lane.generation:
+            now = time.time()
+            if now >= deadline:
+                lane.updated = False  # the caller redraws anyway
+                return TIMEOUT
+            timeout = deadline - now
+            if self.event_driven and lane.updated:
+                ready_at = lane.last_update + self.min_interval
+                if now >= ready_at:
+                    lane.updated = False
+                    lane.last_update = now
+                    return UPDATED
+                timeout = min(timeout, ready_at - now)
+            self._cond.wait(timeout)
+        return SWITCHED
+
+    def _wait(self, lane, generation, seconds):
+        # Must be called with the condition held
+        deadline = time.time() + seconds
+        while self._running and generation == lane.generation:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return True
+            self._cond.wait(remaining)
+        return False
+
+    def _run(self, lane):
+        self._local.lane = lane
+        while True:
+            with self._cond:
+                while self._running and lane.render is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                mode, render, args = lane.mode, lane.render, lane.args
+                interval = max(lane.interval, self.min_interval)
+                generation = lane.render_generation = lane.generation
+                lane.last_update = time.time()
+            due = None
+            try:
+                due = render(*args)
+            except Exception:
+                self.logger.exception('Rendering display mode %s failed', mode)
+            with self._cond:
+                if due is not None:
+                    interval = max(due - time.time(), 0)
+                self._wait_update(lane, generation, interval)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Counters and timing histograms of a character LCD and its bus.
+
+``BaseCharLCD.enable_stats()`` attaches a ``DriverStats`` to a driver. The
+driver then counts commands and data bytes and times ``command()``,
+``write()``, ``flush()`` and its delays, and the bus or GPIO backend is
+wrapped to count transactions, bytes and the time spent transmitting.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import threading
+from contextlib import contextmanager
+from timeit import default_timer
+
+from .compat import range
+
+
+# Upper bounds of the histogram buckets in seconds, 1-2-5 steps from 1us to
+# 1s. A last bucket takes everything slower.
+BUCKETS = tuple(m * 10 ** e / 1e6 for e in range(0, 6) for m in (1, 2, 5)) + (1.0,)
+
+# Bytes sent by the SMBus methods, by method name and arguments
+BUS_BYTES = {
+    'write_byte': lambda address, value: 1,
+    'write_byte_data': lambda address, register, value: 2,
+    'write_i2c_block_data': lambda address, register, values: 1 + len(values),
+    'write_raw': lambda address, values: len(values),
+}
+
+# Pin accesses of the RPi.GPIO methods, no bytes are counted for these
+GPIO_ACCESSES = ('output', 'input')
+
+
+class Histogram(object):
+
+    def __init__(self):
+        """Durations in seconds, counted in the buckets of ``BUCKETS``."""
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket that holds the given fraction of the
+        durations, ``max`` for the last bucket."""
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return 0.0
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+            'buckets': list(zip(BUCKETS + (None,), self.buckets)),
+        }
+
+
+class DriverStats(object):
+
+    def __init__(self):
+        """
+        Counters and histograms of one or more drivers, safe to update from
+        several threads.
+
+        Counters:
+            commands, data_bytes:
+                Instructions and data bytes sent to the display.
+            transactions, bus_bytes:
+                Transfers on the I2C bus or GPIO pin accesses, and the bytes
+                transferred on the I2C bus.
+            bus_time, sleep_time:
+                Seconds spent transmitting and in the delays of the driver.
+
+        Histograms are kept per name, e.g. ``command``, ``write``,
+        ``flush``, ``transaction``, ``sleep`` and ``render.<screen>``.
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start counting from zero."""
+        with self._lock:
+            self.started = default_timer()
+            self.counters = dict.fromkeys(('commands', 'data_bytes', 'transactions', 'bus_bytes'), 0)
+            self.counters.update(bus_time=0.0, sleep_time=0.0)
+            self.histograms = {}
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds, counter=None):
+        """Add a duration to a histogram and, optionally, to a counter."""
+        with self._lock:
+            self._observe(name, seconds, counter)
+
+    def transaction(self, seconds, size=0):
+        """Count a bus transfer of ``size`` bytes that took ``seconds``."""
+        with self._lock:
+            self._observe('transaction', seconds, 'bus_time')
+            self.counters['transactions'] += 1
+            self.counters['bus_bytes'] += size
+
+    def _observe(self, name, seconds, counter):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+        if counter is not None:
+            self.counters[counter] += seconds
+
+    @contextmanager
+    def timed(self, name, counter=None):
+        """Context manager that adds the duration of its block to a histogram."""
+        start = default_timer()
+        try:
+            yield
+        finally:
+            self.observe(name, default_timer() - start, counter)
+
+    def snapshot(self):
+        """
+        Return the counters and histograms as plain values.
+
+        The result has the keys ``elapsed`` (seconds since the last reset),
+        ``bus_load`` (fraction of that time the bus was transmitting),
+        ``counters`` and ``histograms``, which maps names to dicts with
+        ``count``, ``total``, ``mean``, ``p50``, ``p99``, ``max`` and
+        ``buckets`` (pairs of upper bound and count).
+        """
+        with self._lock:
+            elapsed = default_timer() - self.started
+            counters = dict(self.counters)
+            histograms = dict((name, h.snapshot()) for name, h in self.histograms.items())
+        return {
+            'elapsed': elapsed,
+            'bus_load': counters['bus_time'] / elapsed if elapsed > 0 else 0.0,
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def summary(self):
+        """Return the snapshot as a single line of text, e.g. for a log."""
+        snap = self.snapshot()
+        cnt = snap['counters']
+        parts = ['%.0fs: %d commands, %d data bytes, %d transactions, %d bus bytes, '
+                 'bus %.3fs (%.2f%%), sleep %.3fs' % (
+                     snap['elapsed'], cnt['commands'], cnt['data_bytes'], cnt['transactions'],
+                     cnt['bus_bytes'], cnt['bus_time'], snap['bus_load'] * 100, cnt['sleep_time'])]
+        for name in sorted(snap['histograms']):
+            h = snap['histograms'][name]
+            parts.append('%s n=%d mean=%.0fus p99<=%.0fus max=%.0fus' % (
+                name, h['count'], h['mean'] * 1e6, h['p99'] * 1e6, h['max'] * 1e6))
+        return '; '.join(parts)
+
+
+class InstrumentedBackend(object):
+
+    def __init__(self, backend, stats):
+        """
+        Wrapper of an SMBus or RPi.GPIO backend that counts every transfer
+        or pin access in ``stats``. Everything else is passed through.
+        """
+        self._backend = backend
+        self._stats = stats
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if name in BUS_BYTES:
+            size = BUS_BYTES[name]
+        elif name in GPIO_ACCESSES:
+            size = None
+        else:
+            return attr
+        stats = self._stats
+
+        def method(*args):
+            start = default_timer()
+            try:
+                return attr(*args)
+            finally:
+                stats.transaction(default_timer() - start, size(*args) if size else 0)
+
+        # Look up the wrapper only once
+        setattr(self, name, method)
+        return method
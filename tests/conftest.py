@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import importlib
+import logging
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Obj(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class MockCbpi(object):
+    """The parts of the CraftBeerPi 3 api used when importing the plugin."""
+
+    def __init__(self):
+        self.app = Obj(logger=logging.getLogger('tests'))
+        self.cache = {}
+
+    def initalizer(self, order=0):
+        return lambda f: f
+
+    def backgroundtask(self, key, interval):
+        return lambda f: f
+
+
+# pytest imports the plugin package itself when it collects the tests below
+# it, so CraftBeerPi has to be mocked before that
+cbpi = MockCbpi()
+sys.modules['modules'] = types.ModuleType(str('modules'))
+sys.modules['modules'].app = cbpi.app
+sys.modules['modules'].cbpi = cbpi
+sys.path.insert(0, os.path.dirname(ROOT))
+plugin = importlib.import_module(os.path.basename(ROOT))
+
+
+@pytest.fixture(scope='session')
+def lcdlib():
+    """The driver modules of the plugin."""
+    return Obj(**dict((name, importlib.import_module('%s.%s' % (plugin.__name__, name)))
+                      for name in ('common', 'emulator', 'gpio', 'i2c')))
+
+
+@pytest.fixture(scope='session')
+def plugin_module():
+    """The plugin package, imported with the mocked CraftBeerPi."""
+    return plugin
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Check the settings of LCD_Extra_Displays and the mode each display selects.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import pytest
+
+
+class Obj(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Scheduler(object):
+    def __init__(self):
+        self.selected = None
+
+    def select(self, name, *args, **kwargs):
+        self.selected = name
+
+
+@pytest.fixture
+def select(plugin_module, monkeypatch):
+    """Select the mode of a display with fermenters, returns the name."""
+    scheduler = Scheduler()
+    monkeypatch.setattr(plugin_module, 'scheduler', scheduler)
+    monkeypatch.setitem(plugin_module.cbpi.cache, 'fermenter', {1: Obj(id=1)})
+    monkeypatch.setitem(plugin_module.cbpi.cache, 'fermenter_task', {})
+
+    def select(mode, stepname):
+        display = Obj(name='LCD2', mode=mode, kettle_id=None, sensortype=None, charmap='A00')
+        cfg = Obj(lcd_mode='Multidisplay', kettle_id=1, sensortype='ONE_WIRE_SENSOR', refresh_time=3)
+        plugin_module.select_mode(display, cfg, stepname, 1)
+        return scheduler.selected
+    return select
+
+
+def test_parse_displays(plugin_module):
+    settings = plugin_module.parse_displays('0x26 mode=Fermentationdisplay; ; 0x20 expander=MCP23017 bank=A '
+                                            'size=40x4 mode=multidisplay kettle=2; 0xzz')
+    assert settings == [{'address': 0x26, 'port': 1, 'mode': 'Fermentationdisplay'},
+                        {'address': 0x20, 'port': 1, 'expander': 'MCP23017', 'bank': 'A', 'size': (40, 4),
+                         'kettle': 2}]
+
+
+def test_fermentation_mode(select):
+    assert select('Fermentationdisplay', None) == 'Fermentationdisplay'
+    assert select('Fermentationdisplay', 'Mash') == 'Fermentationdisplay'
+
+
+def test_other_modes(select):
+    assert select(None, 'Mash') == 'Multidisplay'
+    assert select('Singledisplay', 'Mash') == 'Singledisplay'
+    # Without an active fermenter step the other modes show the standby screen
+    assert select('Sensordisplay', None) == 'Standby'
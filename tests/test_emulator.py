@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Drive the LCD drivers into the HD44780 emulator and check that the emulated
+screen shows the content cache of the driver without timing violations.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import pytest
+
+FRAMES = ([u'Hello World', u'Zeile 2 Grüße', u'abc', u'0123456789012345678X'],
+          [u'Hello Welt', u'Zeile 2 Grüße', u'', u'X123456789012345678X'])
+GLYPHS = list(u'\ue000\ue001\ue002\ue003\ue004\ue005\ue006\ue007\ue008\ue009')
+
+
+def shown(emu):
+    """The rows shown by all controllers of an emulated backend."""
+    return [row for display in emu.displays for row in display.content()]
+
+
+def violations(emu):
+    return [v for display in emu.displays for v in display.violations]
+
+
+def draw_frames(lcd):
+    for i, glyph in enumerate(GLYPHS):
+        lcd.glyphs.define(glyph, (i + 1,) * 8)
+    for frame in FRAMES:
+        lcd.write_frame(frame)
+    lcd.draw(2, 5, GLYPHS[0] + u'xyz')
+    lcd.flush()
+    lcd.cursor_pos = (1, lcd.lcd.cols - 3)
+    lcd.write_string(u'auto wrap\r\nnext')
+
+
+def assert_matches(lcd, emu):
+    assert shown(emu) == lcd._content
+    assert violations(emu) == []
+
+
+@pytest.mark.parametrize('mode', ['byte', 'block', 'raw'])
+def test_pcf8574(lcdlib, mode):
+    emu = lcdlib.emulator.EmulatedSMBus()
+    lcd = lcdlib.i2c.CharLCD('PCF8574', 0x27, bus=emu, transfer_mode=mode, charmap='A00')
+    draw_frames(lcd)
+    assert_matches(lcd, emu)
+
+
+@pytest.mark.parametrize('expander', ['MCP23008', 'MCP23017'])
+def test_mcp230xx(lcdlib, expander):
+    emu = lcdlib.emulator.EmulatedSMBus(expander=expander)
+    lcd = lcdlib.i2c.CharLCD(expander, 0x20, expander_params={'gpio_bank': 'B'}, bus=emu, charmap='A00')
+    draw_frames(lcd)
+    assert_matches(lcd, emu)
+
+
+@pytest.mark.parametrize('pins_data', [[21, 22, 23, 24], [1, 2, 3, 4, 21, 22, 23, 24]])
+@pytest.mark.parametrize('poll_busy_flag', [False, True])
+def test_gpio(lcdlib, pins_data, poll_busy_flag):
+    emu = lcdlib.emulator.EmulatedGPIO(15, 16, pins_data, pin_rw=18)
+    lcd = lcdlib.gpio.CharLCD(numbering_mode=emu.BOARD, pin_rs=15, pin_rw=18, pin_e=16, pins_data=pins_data,
+                              gpio=emu, poll_busy_flag=poll_busy_flag, charmap='A00')
+    draw_frames(lcd)
+    assert_matches(lcd, emu)
+    # The busy flag of the emulator clears, so polling is never given up
+    assert lcd._poll_busy_flag == poll_busy_flag
+
+
+def test_gpio_dual_controller(lcdlib):
+    emu = lcdlib.emulator.EmulatedGPIO(15, 16, [21, 22, 23, 24], pin_e2=7, cols=40)
+    lcd = lcdlib.gpio.CharLCD(numbering_mode=emu.BOARD, pin_rs=15, pin_e=16, pins_data=[21, 22, 23, 24],
+                              pin_e2=7, cols=40, gpio=emu, charmap='A00')
+    draw_frames(lcd)
+    lcd.write_frame([u'%d' % row * 40 for row in range(4)])
+    assert_matches(lcd, emu)
+
+
+def test_mcp23017_dual_controller(lcdlib):
+    emu = lcdlib.emulator.EmulatedSMBus(expander='MCP23017', cols=40, controllers=2)
+    lcd = lcdlib.i2c.CharLCD('MCP23017', 0x20, expander_params={'gpio_bank': 'A', 'controllers': 2},
+                             cols=40, bus=emu, charmap='A00')
+    draw_frames(lcd)
+    lcd.text_align_mode = 'right'
+    lcd.write_frame([u'right %d' % row for row in range(4)])
+    assert_matches(lcd, emu)
+
+
+@pytest.mark.parametrize('mode', ['byte', 'block'])
+def test_glyph_eviction(lcdlib, mode):
+    emu = lcdlib.emulator.EmulatedSMBus()
+    lcd = lcdlib.i2c.CharLCD('PCF8574', 0x27, bus=emu, transfer_mode=mode, charmap='A00')
+    for i, glyph in enumerate(GLYPHS):
+        lcd.glyphs.define(glyph, (i + 1,) * 8)
+    lcd.write_frame([u''.join(GLYPHS[:8])])
+    # All locations are shown, so the ninth glyph must not evict any of them
+    lcd.draw(1, 0, GLYPHS[8])
+    lcd.flush()
+    assert_matches(lcd, emu)
+    assert [emu.display.glyph(location) for location in range(8)] == [(i + 1,) * 8 for i in range(8)]
+    # Once a glyph is no longer shown, its location can be reused
+    lcd.draw(0, 0, u'x')
+    lcd.draw(1, 0, GLYPHS[9])
+    lcd.flush()
+    assert_matches(lcd, emu)
+    assert emu.display.glyph(lcd._content[1][0]) == (10,) * 8
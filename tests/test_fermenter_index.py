@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Check the fermenter step index against the scan of all steps it replaced.
+"""
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+from collections import OrderedDict
+
+
+class Step(object):
+    def __init__(self, fermenter_id, state, timer_start):
+        self.fermenter_id = fermenter_id
+        self.state = state
+        self.timer_start = timer_start
+
+
+def old_scan(steps, fermenter_id):
+    """The step whose remaining time the fermentation page used to show."""
+    shown = None
+    for key, step in steps.items():
+        if step.timer_start is not None and step.fermenter_id == fermenter_id:
+            shown = step
+    return shown
+
+
+def index(plugin_module, steps):
+    tasks = plugin_module.FermenterTaskIndex()
+    tasks.rebuild(steps)
+    return tasks
+
+
+def test_matches_old_scan(plugin_module):
+    # Several timed steps per fermenter, none of them active
+    steps = OrderedDict((i, Step(i % 3, 'D', 1000.0 * i)) for i in range(1, 13))
+    steps[13] = Step(1, 'I', None)
+    steps[14] = Step(3, 'I', None)
+    tasks = index(plugin_module, steps)
+    for fermenter_id in range(5):
+        assert tasks.get(fermenter_id) is old_scan(steps, fermenter_id)
+    assert not tasks.any_active
+
+
+def test_active_step_wins(plugin_module):
+    steps = OrderedDict([(1, Step(1, 'D', 1000.0)), (2, Step(1, 'A', 2000.0)), (3, Step(1, 'I', 3000.0))])
+    tasks = index(plugin_module, steps)
+    assert tasks.get(1) is steps[2]
+    assert tasks.any_active
+
+
+def test_active_step_without_timer(plugin_module):
+    # A step that was just started has no timer yet, the other timers stay shown
+    steps = OrderedDict([(1, Step(1, 'D', 1000.0)), (2, Step(1, 'D', 2000.0)), (3, Step(1, 'A', None))])
+    tasks = index(plugin_module, steps)
+    assert tasks.get(1) is old_scan(steps, 1) is steps[2]
+    assert tasks.any_active
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, division, absolute_import, unicode_literals
+
+import logging
+import threading
+from collections import namedtuple, OrderedDict
+
+
+Frame = namedtuple('Frame', 'lines clear')
+
+module_logger = logging.getLogger(__name__)
+
+
+class DisplayWriter(object):
+
+    def __init__(self, lcd, name='lcdwriter', logger=None):
+        """
+        Dedicated thread that owns the character LCDs on one bus and writes
+        frames to them.
+
+        Producers hand over complete frames with ``submit()`` and return
+        immediately. Only the most recent frame per display is kept: if the
+        bus is still busy with a previous frame, any frame that was waiting
+        for the same display is replaced, so the bus never falls behind the
+        producers. Displays with waiting frames take turns, one frame each.
+
+        Args:
+            lcd:
+                The default ``CharLCD`` instance. No other thread should
+                write to it, or to other displays passed to ``submit()``,
+                once the writer has been started.
+            name:
+                Name of the writer thread. Default: ``lcdwriter``.
+            logger:
+                Logger for failed writes. Default: the module logger.
+
+        """
+        self.lcd = lcd
+        self.name = name
+        self.logger = logger or module_logger
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self._pending = OrderedDict()  # LCD -> Frame, in the order they are written
+        self._running = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def start(self):
+        """Start the writer thread."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the writer thread. Frames that are still pending are dropped."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, lines, clear=False, lcd=None):
+        """
+        Queue a frame for a display, replacing a frame for the same display
+        that is still waiting to be written.
+
+        Args:
+            lines:
+                The lines of the frame, one per row, as unicode strings or
+                as rows of raw bytes like the ones ``CompiledLayout.render()``
+                returns.
+            clear:
+                Whether to clear the display before writing the frame.
+            lcd:
+                The display. Default: ``None``, the default display.
+
+        """
+        lcd = self.lcd if lcd is None else lcd
+        with self._cond:
+            if lcd in self._pending:
+                # The replaced frame keeps its turn
+                self.frames_dropped += 1
+            self._pending[lcd] = Frame(lines=list(lines), clear=clear)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                lcd, frame = self._pending.popitem(last=False)
+            try:
+                self._write(lcd, frame)
+            except Exception:
+                self.logger.exception('Writing frame to the LCD failed')
+
+    def _write(self, lcd, frame):
+        # The cursor sometimes shows up randomly, so hide it on every frame.
+        lcd.cursor_mode = 'hide'
+        if frame.clear:
+            lcd.clear()
+        lcd.write_frame(frame.lines)
+        self.frames_written += 1